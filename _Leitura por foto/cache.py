@@ -0,0 +1,93 @@
+"""
+Cache dos resultados da detecção, com chave exata (sha256 dos bytes) e
+perceptual (dHash de 64 bits da foto reduzida). A mesma foto reenviada bate
+na chave exata; a mesma foto recomprimida ou reexportada por outro aparelho
+bate no dHash, desde que tenha a mesma resolução. Entradas expiram pelo TTL
+e, passando do limite, as menos usadas saem primeiro.
+"""
+import time
+from collections import Counter, OrderedDict
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def dhash(gray: np.ndarray) -> int:
+    """Hash de diferença: 64 bits comparando pixels vizinhos numa grade 9x8."""
+    pequeno = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (pequeno[:, 1:] > pequeno[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def assinatura(data: bytes):
+    """(dhash, largura, altura) decodificando a foto já reduzida a 1/8."""
+    gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        raise ValueError("imagem inválida")
+    h, w = gray.shape[:2]
+    return dhash(gray), w, h
+
+
+class CacheDeteccao:
+    def __init__(self, max_entradas: int = 512, ttl: float = 600.0, distancia_max: int = 4):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.distancia_max = distancia_max
+        # sha256 -> (expira_em, dhash, (largura, altura), resultado)
+        self._entradas: OrderedDict = OrderedDict()
+        self.contadores = Counter()
+
+    def _expirar(self):
+        agora = time.monotonic()
+        vencidas = [k for k, (expira, *_) in self._entradas.items() if expira <= agora]
+        for k in vencidas:
+            del self._entradas[k]
+        self.contadores["expiradas"] += len(vencidas)
+
+    def buscar_exato(self, sha: str) -> Optional[dict]:
+        self.contadores["consultas"] += 1
+        entrada = self._entradas.get(sha)
+        if entrada is None or entrada[0] <= time.monotonic():
+            return None
+        self._entradas.move_to_end(sha)
+        self.contadores["acertos_exatos"] += 1
+        return entrada[3]
+
+    def buscar_perceptual(self, hash_: int, tamanho) -> Optional[dict]:
+        """Entrada de mesma resolução com dHash a até `distancia_max` bits."""
+        self._expirar()
+        candidatos = [(k, e[1]) for k, e in self._entradas.items() if e[2] == tamanho]
+        if not candidatos:
+            return None
+        hashes = np.array([h for _, h in candidatos], dtype=np.uint64)
+        distancias = np.unpackbits(
+            (hashes ^ np.uint64(hash_)).view(np.uint8).reshape(-1, 8), axis=1
+        ).sum(axis=1)
+        i = int(distancias.argmin())
+        if distancias[i] > self.distancia_max:
+            return None
+        chave = candidatos[i][0]
+        self._entradas.move_to_end(chave)
+        self.contadores["acertos_perceptuais"] += 1
+        return self._entradas[chave][3]
+
+    def guardar(self, sha: str, hash_: int, tamanho, resultado: dict):
+        self._entradas[sha] = (time.monotonic() + self.ttl, hash_, tamanho, resultado)
+        self._entradas.move_to_end(sha)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+            self.contadores["descartadas"] += 1
+
+    def metricas(self) -> dict:
+        c = self.contadores
+        consultas = c["consultas"]
+        acertos = c["acertos_exatos"] + c["acertos_perceptuais"] + c["coalescidas"]
+        return {
+            **{k: c[k] for k in (
+                "consultas", "acertos_exatos", "acertos_perceptuais", "coalescidas",
+                "calculadas", "expiradas", "descartadas",
+            )},
+            "taxa_acerto": round(acertos / consultas, 4) if consultas else 0.0,
+            "entradas": len(self._entradas),
+        }
@@ -0,0 +1,151 @@
+"""
+Extração dos vãos (slots) de uma estante a partir das linhas de Hough.
+
+Os segmentos são separados em horizontais e verticais pelo ângulo e
+agrupados pelo deslocamento (y das horizontais, x das verticais). Cada grupo
+vira uma linha com espessura [inicio, fim] - as duas bordas de uma mesma
+prateleira caem no mesmo grupo. Prateleiras precisam atravessar boa parte da
+foto; divisórias só precisam existir dentro do nível em que aparecem. O vão
+é a abertura livre entre as linhas e sua confiança é a fração do contorno
+que tem borda de verdade no mapa do Canny.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+TOLERANCIA_ANGULO = np.deg2rad(5)
+# distância máxima (fração do lado) entre segmentos de uma mesma linha
+JUNTAR = 0.02
+# fração da largura que uma prateleira precisa cobrir de bordas
+COBERTURA_PRATELEIRA = 0.7
+# fração da altura do nível que uma divisória precisa cobrir
+COBERTURA_DIVISORIA = 0.85
+# lado mínimo de um vão (fração do lado da foto)
+VAO_MINIMO = 0.03
+# raio (px) do dilate aplicado às bordas antes de medir a cobertura
+RAIO = 2
+
+
+@dataclass
+class Linha:
+    inicio: int
+    fim: int
+
+
+def segmentos_por_orientacao(lines: Optional[np.ndarray]):
+    """Separa os segmentos (N, 4) do HoughLinesP em horizontais e verticais."""
+    if lines is None:
+        vazio = np.empty((0, 4), np.float32)
+        return vazio, vazio
+    seg = lines.reshape(-1, 4).astype(np.float32)
+    dx = seg[:, 2] - seg[:, 0]
+    dy = seg[:, 3] - seg[:, 1]
+    angulo = np.abs(np.arctan2(dy, dx)) % np.pi
+    horizontal = (angulo < TOLERANCIA_ANGULO) | (angulo > np.pi - TOLERANCIA_ANGULO)
+    vertical = np.abs(angulo - np.pi / 2) < TOLERANCIA_ANGULO
+    return seg[horizontal], seg[vertical]
+
+
+def agrupar(deslocamentos: np.ndarray, distancia: float) -> List[Linha]:
+    """Agrupa deslocamentos 1D: um novo grupo começa a cada salto > `distancia`."""
+    if len(deslocamentos) == 0:
+        return []
+    d = np.sort(deslocamentos)
+    cortes = np.flatnonzero(np.diff(d) > distancia) + 1
+    inicios = d[np.r_[0, cortes]]
+    fins = d[np.r_[cortes - 1, len(d) - 1]]
+    return [Linha(int(round(a)), int(round(b))) for a, b in zip(inicios, fins)]
+
+
+def _cobertura(acumulada: np.ndarray, posicoes, a: int, b: int) -> np.ndarray:
+    """
+    Fração de pixels de borda entre `a` e `b` em cada posição dada (linhas
+    ou colunas de `acumulada`, soma acumulada no outro eixo).
+    """
+    if b <= a:
+        return np.zeros(len(posicoes))
+    return (acumulada[posicoes, b] - acumulada[posicoes, a]) / (b - a)
+
+
+def _ajustar(acumulada: np.ndarray, linha: Linha, a: int, b: int, limiar: float):
+    """
+    Restringe a linha às posições cuja cobertura entre `a` e `b` passa do
+    limiar (descarta bordas de produtos que caíram no mesmo grupo). Devolve
+    a linha ajustada e a cobertura, ou None.
+    """
+    posicoes = np.arange(linha.inicio, linha.fim + 1)
+    cobertura = _cobertura(acumulada, posicoes, a, b)
+    fortes = posicoes[cobertura >= limiar]
+    if len(fortes) == 0:
+        return None
+    # desfaz o engrossamento do dilate nas duas pontas
+    inicio = min(int(fortes[0]) + RAIO, int(fortes[-1]))
+    fim = max(int(fortes[-1]) - RAIO, inicio)
+    return Linha(inicio, fim), float(cobertura.max())
+
+
+def extrair_slots(edges: np.ndarray, lines: Optional[np.ndarray]) -> List[dict]:
+    """
+    Monta a grade de vãos a partir do mapa de bordas e dos segmentos de
+    Hough, nas coordenadas de `edges`.
+    """
+    h, w = edges.shape[:2]
+    horizontais, verticais = segmentos_por_orientacao(lines)
+
+    # bordas engrossadas em ±RAIO px para tolerar o arredondamento das linhas
+    k = 2 * RAIO + 1
+    borda = cv2.dilate(edges, np.ones((k, k), np.uint8)) > 0
+    # somas acumuladas com um zero à frente: linhas ao longo de x, colunas ao longo de y
+    acum_x = np.zeros((h, w + 1), np.int32)
+    np.cumsum(borda, axis=1, out=acum_x[:, 1:])
+    acum_y = np.zeros((w, h + 1), np.int32)
+    np.cumsum(borda.T, axis=1, out=acum_y[:, 1:])
+
+    prateleiras = []
+    for l in agrupar((horizontais[:, 1] + horizontais[:, 3]) / 2, JUNTAR * h):
+        ajuste = _ajustar(acum_x, l, 0, w, COBERTURA_PRATELEIRA)
+        if ajuste:
+            prateleiras.append(ajuste[0])
+    divisorias = agrupar((verticais[:, 0] + verticais[:, 2]) / 2, JUNTAR * w)
+
+    slots = []
+    for topo, base in zip(prateleiras, prateleiras[1:]):
+        y0, y1 = topo.fim, base.inicio
+        if y1 - y0 < VAO_MINIMO * h:
+            continue
+        laterais = [
+            a for a in (
+                _ajustar(acum_y, d, y0, y1, COBERTURA_DIVISORIA) for d in divisorias
+            ) if a
+        ]
+        for (esq, c_esq), (dir_, c_dir) in zip(laterais, laterais[1:]):
+            x0, x1 = esq.fim, dir_.inicio
+            if x1 - x0 < VAO_MINIMO * w:
+                continue
+            c_topo, c_base = _cobertura(acum_x, [y0, y1], x0, x1)
+            slots.append({
+                "x": x0, "y": y0, "w": x1 - x0, "h": y1 - y0,
+                "confianca": round(float(np.mean([c_topo, c_base, c_esq, c_dir])), 3),
+            })
+    return slots
+
+
+def escalar(slots: List[dict], escala: float) -> List[dict]:
+    """Leva os vãos da imagem reduzida de volta às coordenadas da foto."""
+    for s in slots:
+        for k in ("x", "y", "w", "h"):
+            s[k] = int(round(s[k] / escala))
+    return slots
+
+
+def em_mm(slots: List[dict], mm_por_px: float) -> List[dict]:
+    """
+    Acrescenta largura e altura em mm (escala da foto original), prontas para
+    virar `Celula` no alocador.
+    """
+    for s in slots:
+        s["largura_mm"] = round(s["w"] * mm_por_px, 1)
+        s["altura_mm"] = round(s["h"] * mm_por_px, 1)
+    return slots
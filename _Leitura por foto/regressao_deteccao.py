@@ -0,0 +1,136 @@
+"""
+Regressão da detecção de vãos em fotos sintéticas de estantes.
+
+Cada imagem é renderizada com uma grade conhecida (níveis, divisórias por
+nível, espessuras variadas), produtos nos vãos, ruído, desfoque e compressão
+JPEG, e passa pelo mesmo `processar` do servidor. Um vão conta como acerto
+quando algum slot detectado tem IoU >= 0.8 com ele. Parte das imagens é
+gravada deitada com orientação EXIF 6 ou 8, como as fotos de celular, e
+os vãos continuam esperados na foto já girada.
+
+    python regressao_deteccao.py -n 20 --seed 0
+"""
+import argparse
+import struct
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from server import processar
+
+IOU_MINIMO = 0.8
+
+
+def renderizar(rng: np.random.Generator, largura: int = 4000, altura: int = 3000):
+    """Devolve (jpeg, vãos esperados) de uma estante aleatória."""
+    fundo = rng.integers(150, 220)
+    img = np.full((altura, largura, 3), fundo, np.uint8)
+    img = cv2.add(img, rng.integers(0, 25, (altura, largura, 3), dtype=np.uint8))
+    cor_estante = tuple(int(c) for c in rng.integers(20, 90, 3))
+    esp = int(rng.integers(20, 45))
+
+    n_niveis = int(rng.integers(2, 5))
+    margem_x, margem_y = int(largura * 0.05), int(altura * 0.05)
+    ys = np.linspace(margem_y, altura - margem_y, n_niveis + 1).astype(int)
+    x_esq, x_dir = margem_x, largura - margem_x
+
+    vaos = []
+    for y in ys:
+        cv2.rectangle(img, (x_esq - esp, y), (x_dir + esp, y + esp), cor_estante, -1)
+    for topo, base in zip(ys, ys[1:]):
+        y0, y1 = topo + esp, base
+        n_cols = int(rng.integers(1, 6))
+        cortes = np.sort(rng.uniform(0.15, 0.85, n_cols - 1))
+        cortes = cortes[np.r_[True, np.diff(cortes) > 0.12]] if len(cortes) else cortes
+        xs = np.r_[x_esq, x_esq + (x_dir - x_esq) * cortes, x_dir].astype(int)
+        # laterais por fora da área útil, divisórias internas centradas no corte
+        postes = [(x_esq - esp, x_esq)]
+        postes += [(x - esp // 2, x - esp // 2 + esp) for x in xs[1:-1]]
+        postes += [(x_dir, x_dir + esp)]
+        for xa, xb in postes:
+            cv2.rectangle(img, (xa, y0), (xb, y1), cor_estante, -1)
+        for (_, x0), (x1, _) in zip(postes, postes[1:]):
+            vaos.append((x0, y0, x1 - x0, y1 - y0))
+            # produtos dentro do vão, sem encostar no contorno
+            for _ in range(int(rng.integers(0, 4))):
+                pw = int(rng.uniform(0.1, 0.3) * (x1 - x0))
+                ph = int(rng.uniform(0.2, 0.7) * (y1 - y0))
+                px = int(rng.uniform(x0 + 20, max(x0 + 21, x1 - pw - 20)))
+                cor = tuple(int(c) for c in rng.integers(0, 255, 3))
+                cv2.rectangle(img, (px, y1 - ph - 5), (px + pw, y1 - 5), cor, -1)
+
+    img = cv2.GaussianBlur(img, (5, 5), 1.5)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return buf.tobytes(), vaos
+
+
+# orientação EXIF -> rotação que grava deitada uma foto em pé
+ROTACOES_EXIF = {6: cv2.ROTATE_90_COUNTERCLOCKWISE, 8: cv2.ROTATE_90_CLOCKWISE}
+
+
+def girar_exif(jpeg: bytes, orientacao: int) -> bytes:
+    """Grava a foto deitada com a tag EXIF que a põe de volta em pé."""
+    img = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    ok, buf = cv2.imencode(".jpg", cv2.rotate(img, ROTACOES_EXIF[orientacao]),
+                           [cv2.IMWRITE_JPEG_QUALITY, 85])
+    # TIFF big-endian com um único IFD: Orientation (0x0112), SHORT
+    tiff = (b"MM\x00*\x00\x00\x00\x08" + struct.pack(">H", 1)
+            + struct.pack(">HHIHH", 0x0112, 3, 1, orientacao, 0) + b"\x00" * 4)
+    app1 = b"Exif\x00\x00" + tiff
+    dados = buf.tobytes()
+    return dados[:2] + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + dados[2:]
+
+
+def iou(a, b) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    iw = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    ih = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = iw * ih
+    return inter / (aw * ah + bw * bh - inter)
+
+
+def avaliar(esperados, detectados):
+    acertos = sum(
+        any(iou(v, (s["x"], s["y"], s["w"], s["h"])) >= IOU_MINIMO for s in detectados)
+        for v in esperados
+    )
+    return acertos, len(esperados), len(detectados)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regressão da detecção de vãos")
+    parser.add_argument("-n", type=int, default=20, help="Número de imagens")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--recall-minimo", type=float, default=0.9)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    tot_acertos = tot_esperados = tot_detectados = 0
+    tempos = []
+    for i in range(args.n):
+        jpeg, esperados = renderizar(rng)
+        orientacao = {1: 6, 3: 8}.get(i % 4)
+        if orientacao:
+            jpeg = girar_exif(jpeg, orientacao)
+        inicio = time.perf_counter()
+        r = processar(jpeg)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        acertos, n_esp, n_det = avaliar(esperados, r["slots"])
+        tot_acertos += acertos
+        tot_esperados += n_esp
+        tot_detectados += n_det
+        print(f"img {i:3d}{f' (EXIF {orientacao})' if orientacao else '':>9}: {acertos}/{n_esp} vãos, {n_det} detectados, "
+              f"{tempos[-1]:.1f} ms {r['tempos_ms']}")
+
+    recall = tot_acertos / tot_esperados
+    precisao = tot_acertos / max(tot_detectados, 1)
+    print(f"\nrecall {recall:.3f}  precisão {precisao:.3f}  "
+          f"tempo mediano {np.median(tempos):.1f} ms")
+    sys.exit(0 if recall >= args.recall_minimo else 1)
+
+
+if __name__ == "__main__":
+    main()
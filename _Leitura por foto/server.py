@@ -1,31 +1,291 @@
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import os
+import struct
+import time
+from typing import Optional
 import cv2, numpy as np
-import io
 from pydantic import BaseModel
 
-app = FastAPI()
+import deteccao
+from cache import CacheDeteccao, assinatura
+
+# Lado maior (px) da imagem usada na detecção; as fotos chegam com 12 MP ou
+# mais e as bordas das prateleiras sobrevivem bem a essa redução
+LADO_TRABALHO = int(os.environ.get("LADO_TRABALHO", "1280"))
+WORKERS = int(os.environ.get("WORKERS", str(os.cpu_count() or 1)))
+
+# Limites de upload: por arquivo e número de arquivos no lote
+MAX_UPLOAD = int(os.environ.get("MAX_UPLOAD_MB", "20")) * 1024 * 1024
+LOTE_MAX = int(os.environ.get("LOTE_MAX", "16"))
+BLOCO_UPLOAD = 1024 * 1024
+
+CACHE_MAX = int(os.environ.get("CACHE_MAX", "512"))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", "600"))
+
+pool: ProcessPoolExecutor = None
+cache = CacheDeteccao(CACHE_MAX, CACHE_TTL)
+# sha256 -> future da detecção em andamento, compartilhada por uploads idênticos
+em_andamento: dict[str, asyncio.Future] = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global pool
+    pool = ProcessPoolExecutor(max_workers=WORKERS)
+    yield
+    pool.shutdown(cancel_futures=True)
+
+app = FastAPI(lifespan=lifespan)
+
+
+class LimitarUpload:
+    """
+    Limita o corpo das rotas de upload. Recusa pelo Content-Length antes de
+    o multipart ser lido e, como o cabeçalho pode faltar ou mentir, conta os
+    bytes do próprio stream: passou do limite, a leitura aborta com 413
+    antes de o Starlette acabar de gravar as partes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/detect_slots"):
+            await self.app(scope, receive, send)
+            return
+        # folga para os cabeçalhos das partes do multipart
+        limite = MAX_UPLOAD * (LOTE_MAX if scope["path"].endswith("/lote") else 1) + 64 * 1024
+        tamanho = Headers(scope=scope).get("content-length")
+        if tamanho is not None and not (tamanho.isascii() and tamanho.isdigit()):
+            resposta = JSONResponse({"detail": "Content-Length inválido"}, status_code=400)
+            await resposta(scope, receive, send)
+            return
+        if tamanho is not None and int(tamanho) > limite:
+            resposta = JSONResponse({"detail": "upload maior que o permitido"}, status_code=413)
+            await resposta(scope, receive, send)
+            return
+
+        recebido = 0
+
+        async def receber():
+            nonlocal recebido
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebido += len(mensagem.get("body", b""))
+                if recebido > limite:
+                    raise HTTPException(status_code=413, detail="upload maior que o permitido")
+            return mensagem
+
+        await self.app(scope, receber, send)
+
+# o último registrado fica por fora: o CORS envolve o limite, e os 413/400
+# dele também levam os cabeçalhos CORS
+app.add_middleware(LimitarUpload)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
 class Slot(BaseModel):
     x: int; y: int; w: int; h: int
+    confianca: float
+    largura_mm: Optional[float] = None
+    altura_mm: Optional[float] = None
 
 class SlotsResponse(BaseModel):
     slots: list[Slot]
+    largura: int
+    altura: int
+    tempos_ms: dict[str, float]
+    # None quando calculado agora; senão "exata", "perceptual" ou "coalescida"
+    cache: Optional[str] = None
 
-@app.post("/api/detect_slots", response_model=SlotsResponse)
-async def detect_slots(file: UploadFile = File(...)):
-    data = await file.read()
-    arr = np.frombuffer(data, np.uint8)
-    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+def reduzir(img: np.ndarray, lado_max: int):
+    """Reduz a imagem para que o lado maior tenha no máximo `lado_max` px."""
+    h, w = img.shape[:2]
+    escala = min(1.0, lado_max / max(h, w))
+    if escala < 1.0:
+        img = cv2.resize(img, (round(w * escala), round(h * escala)), interpolation=cv2.INTER_AREA)
+    return img, escala
+
+
+def dimensoes_cabecalho(data) -> Optional[tuple]:
+    """(largura, altura) lidas do cabeçalho PNG ou JPEG, sem decodificar."""
+    mv = memoryview(data)
+    if mv[:8] == b"\x89PNG\r\n\x1a\n" and len(mv) >= 24:
+        return struct.unpack(">II", mv[16:24])
+    if mv[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(mv):
+        if mv[i] != 0xFF:
+            return None
+        marcador = mv[i + 1]
+        if marcador == 0xFF:  # bytes de preenchimento
+            i += 1
+            continue
+        tamanho = struct.unpack(">H", mv[i + 2:i + 4])[0]
+        # SOF0..SOF15, exceto DHT (C4), JPG (C8) e DAC (CC)
+        if 0xC0 <= marcador <= 0xCF and marcador not in (0xC4, 0xC8, 0xCC):
+            altura, largura = struct.unpack(">HH", mv[i + 5:i + 9])
+            return largura, altura
+        i += 2 + tamanho
+    return None
+
+
+FLAGS_REDUZIDO = {
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+}
+
+
+def decodificar(data, lado_max: int):
+    """
+    Decodifica direto em tons de cinza e já reduzida pelo maior fator
+    (8, 4 ou 2) que ainda deixa o lado maior >= `lado_max`; no JPEG a
+    redução acontece dentro do próprio decodificador (escala da DCT), sem
+    passar pela imagem cheia. Devolve (imagem, (largura, altura) original),
+    ambas já na orientação EXIF, que o `imdecode` aplica.
+    """
+    dims = dimensoes_cabecalho(data)
+    flag, fator = cv2.IMREAD_GRAYSCALE, 1
+    if dims:
+        for f, flag_reduzido in FLAGS_REDUZIDO.items():
+            if max(dims) // f >= lado_max:
+                flag, fator = flag_reduzido, f
+                break
+    gray = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+    if gray is None:
+        raise ValueError("imagem inválida")
+    gh, gw = gray.shape[:2]
+    if dims:
+        # o cabeçalho traz as medidas gravadas; com orientação 5 a 8 o
+        # decodificador gira a imagem e largura e altura trocam de lugar
+        w, h = dims
+        if (gw, gh) == (-(-w // fator), -(-h // fator)):
+            return gray, (w, h)
+        if (gw, gh) == (-(-h // fator), -(-w // fator)):
+            return gray, (h, w)
+    return gray, (gw * fator, gh * fator)
+
+
+def processar(data, lado_max: int = LADO_TRABALHO) -> dict:
+    """
+    Toda a parte pesada (decodificação, redução, Canny, Hough e extração dos
+    slots) roda aqui, dentro de um processo do pool. Os slots voltam nas
+    coordenadas da foto original.
+    """
+    tempos = {}
+    t = time.perf_counter()
+
+    def marcar(etapa):
+        nonlocal t
+        agora = time.perf_counter()
+        tempos[etapa] = round((agora - t) * 1000, 2)
+        t = agora
+
+    gray, (w, h) = decodificar(data, lado_max)
+    marcar("decodificar")
+    gray, _ = reduzir(gray, lado_max)
+    escala = gray.shape[1] / w  # decodificação reduzida + resize, já orientada
+    marcar("reduzir")
     edges = cv2.Canny(gray, 50, 150)
+    marcar("bordas")
     lines = cv2.HoughLinesP(edges,1,np.pi/180,100,minLineLength=50,maxLineGap=10)
-    # simplificação: detecta retângulos fixos
-    # A sua lógica de agrupar linhas e extrair slots entra aqui
-    slots = []
-    # Exemplo estático para testar:
-    h, w = img.shape[:2]
-    slots.append({"x": int(w*0.1), "y": int(h*0.1), "w": int(w*0.3), "h": int(h*0.3)})
-    slots.append({"x": int(w*0.6), "y": int(h*0.1), "w": int(w*0.3), "h": int(h*0.3)})
-    return {"slots": slots}
+    marcar("hough")
+    slots = deteccao.escalar(deteccao.extrair_slots(edges, lines), escala)
+    marcar("slots")
+    return {"slots": slots, "largura": w, "altura": h, "tempos_ms": tempos}
+
+
+async def _calcular(data: bytes, sha: str):
+    loop = asyncio.get_running_loop()
+    hash_, w, h = await loop.run_in_executor(pool, assinatura, data)
+    resultado = cache.buscar_perceptual(hash_, (w, h))
+    if resultado is not None:
+        # guarda também pelo sha desta variante: o próximo reenvio bate na chave exata
+        cache.guardar(sha, hash_, (w, h), resultado)
+        return resultado, "perceptual"
+    resultado = await loop.run_in_executor(pool, processar, data, LADO_TRABALHO)
+    cache.contadores["calculadas"] += 1
+    cache.guardar(sha, hash_, (w, h), resultado)
+    return resultado, None
+
+
+async def ler_upload(file: UploadFile) -> bytearray:
+    """
+    Lê o upload em blocos para um único buffer, abortando com 413 assim que
+    passar de MAX_UPLOAD. É o limite por arquivo dentro de um lote; o que
+    segura a memória é o limite do corpo em `LimitarUpload`.
+    """
+    buf = bytearray()
+    while bloco := await file.read(BLOCO_UPLOAD):
+        if len(buf) + len(bloco) > MAX_UPLOAD:
+            raise HTTPException(status_code=413, detail=f"{file.filename}: maior que o permitido")
+        buf += bloco
+    return buf
+
+
+async def _detectar(file: UploadFile, mm_por_px: Optional[float] = None) -> dict:
+    data = await ler_upload(file)
+    inicio = time.perf_counter()
+    sha = hashlib.sha256(data).hexdigest()
+    resultado, origem = cache.buscar_exato(sha), "exata"
+    try:
+        if resultado is None and sha in em_andamento:
+            resultado, origem = await asyncio.shield(em_andamento[sha]), "coalescida"
+            cache.contadores["coalescidas"] += 1
+        elif resultado is None:
+            futuro = asyncio.get_running_loop().create_future()
+            em_andamento[sha] = futuro
+            try:
+                resultado, origem = await _calcular(data, sha)
+                futuro.set_result(resultado)
+            except Exception as e:
+                futuro.set_exception(e)
+                futuro.exception()  # evita aviso quando ninguém mais espera
+                raise
+            finally:
+                # cancelado (cliente caiu, servidor parando): solta quem espera
+                if not futuro.done():
+                    futuro.cancel()
+                del em_andamento[sha]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"{file.filename}: {e}")
+
+    # o resultado em cache é compartilhado: cada resposta trabalha numa cópia
+    resposta = {**resultado, "slots": [dict(s) for s in resultado["slots"]], "cache": origem}
+    if origem is not None:
+        resposta["tempos_ms"] = {"cache": round((time.perf_counter() - inicio) * 1000, 2)}
+    if mm_por_px:
+        deteccao.em_mm(resposta["slots"], mm_por_px)
+    return resposta
+
+
+@app.post("/api/detect_slots", response_model=SlotsResponse)
+async def detect_slots(file: UploadFile = File(...), mm_por_px: Optional[float] = None):
+    """`mm_por_px` (escala da foto, se conhecida) acrescenta as medidas em mm."""
+    return await _detectar(file, mm_por_px)
+
+
+@app.post("/api/detect_slots/lote", response_model=list[SlotsResponse])
+async def detect_slots_lote(
+    files: list[UploadFile] = File(...),
+    mm_por_px: Optional[float] = None
+):
+    """Várias fotos por requisição, processadas em paralelo no pool."""
+    if len(files) > LOTE_MAX:
+        raise HTTPException(status_code=413, detail=f"no máximo {LOTE_MAX} arquivos por lote")
+    return await asyncio.gather(*(_detectar(f, mm_por_px) for f in files))
+
+
+@app.get("/api/metrics")
+async def metrics():
+    """Taxas de acerto e tamanho do cache de detecção."""
+    return {**cache.metricas(), "em_andamento": len(em_andamento)}
@@ -0,0 +1,178 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from alocacao_nas_celulas import (
+    Celula,
+    TabelaProdutos,
+    allocate_grouped_cells,
+    load_data_from_sqlite,
+)
+
+
+@dataclass
+class Rack:
+    nome: str
+    celula: Celula
+    n_celulas: int
+
+
+def carregar_layout(caminho_csv: str) -> List[Rack]:
+    """
+    Lê a tabela de layout: uma linha por rack com as colunas
+    rack, largura, profundidade, altura (mm) e n_celulas.
+    """
+    df = pd.read_csv(caminho_csv)
+    return [
+        Rack(
+            nome=str(row.rack),
+            celula=Celula(
+                largura=int(row.largura),
+                profundidade=int(row.profundidade),
+                altura=int(row.altura)
+            ),
+            n_celulas=int(row.n_celulas)
+        )
+        for row in df.itertuples(index=False)
+    ]
+
+
+def particionar_skus(
+    produtos: TabelaProdutos,
+    racks: List[Rack]
+) -> Dict[str, np.ndarray]:
+    """
+    Distribui os SKUs entre os racks: do maior para o menor volume de demanda,
+    cada SKU vai para o rack compatível com mais volume livre. SKUs que não
+    cabem em nenhuma célula ficam fora de todos os racks.
+    """
+    livre = np.array([
+        r.n_celulas * r.celula.largura * r.celula.profundidade * r.celula.altura
+        for r in racks
+    ], dtype=np.float64)
+    compativel = np.stack([produtos.cap_per_col(r.celula) > 0 for r in racks])
+    volume = produtos.demanda * produtos.dims.prod(axis=1, dtype=np.int64)
+    destino = np.full(len(produtos), -1, dtype=np.int64)
+
+    for j in np.argsort(-volume, kind='stable'):
+        candidatos = np.flatnonzero(compativel[:, j])
+        if candidatos.size == 0:
+            continue
+        r = candidatos[np.argmax(livre[candidatos])]
+        destino[j] = r
+        livre[r] -= volume[j]
+
+    # preserva a ordem original dos produtos dentro de cada rack
+    return {r.nome: np.flatnonzero(destino == k) for k, r in enumerate(racks)}
+
+
+def _resolver_rack(tarefa):
+    nome, celula, n_celulas, sub_produtos = tarefa
+    return nome, allocate_grouped_cells(sub_produtos, n_celulas, celula=celula)
+
+
+def alocar_multi_rack(
+    produtos: TabelaProdutos,
+    racks: List[Rack],
+    workers: int = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Resolve cada rack de forma independente em um pool de processos e junta
+    os resultados em um resumo por SKU e um detalhe (sku, rack, celula, qtd).
+    """
+    partes = particionar_skus(produtos, racks)
+    tarefas = [
+        (r.nome, r.celula, r.n_celulas, produtos[partes[r.nome]])
+        for r in racks if partes[r.nome].size
+    ]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        resultados = dict(pool.map(_resolver_rack, tarefas))
+
+    rack_de = np.full(len(produtos), '', dtype=object)
+    alocado = np.zeros(len(produtos), dtype=np.int64)
+    detalhes = []
+    for r in racks:
+        if r.nome not in resultados:
+            continue
+        idx = partes[r.nome]
+        allocation = resultados[r.nome]
+        rack_de[idx] = r.nome
+        alocado[idx] = allocation.sum(axis=0)
+        celulas, k = np.nonzero(allocation)
+        detalhes.append(pd.DataFrame({
+            'sku': produtos.sku[idx[k]],
+            'rack': r.nome,
+            'celula': celulas + 1,
+            'qtd': allocation[celulas, k],
+        }))
+
+    resumo = pd.DataFrame({
+        'sku': produtos.sku,
+        'nome_produto': produtos.nome,
+        'rack': rack_de,
+        'total_necessario': produtos.demanda,
+        'total_alocado': alocado,
+        'total_que_nao_coube': produtos.demanda - alocado,
+    })
+    colunas = ['sku', 'rack', 'celula', 'qtd']
+    detalhe = pd.concat(detalhes, ignore_index=True) if detalhes else pd.DataFrame(columns=colunas)
+    return resumo, detalhe
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Aloca produtos em vários racks com células de tamanhos diferentes"
+    )
+    parser.add_argument(
+        "--db", type=str,
+        default=os.path.abspath(
+            os.path.join(
+                os.path.dirname(__file__), "..", "data", "produtos.db"
+            )
+        ),
+        help="Caminho para o banco SQLite."
+    )
+    parser.add_argument(
+        "--layout", type=str,
+        default=os.path.abspath(
+            os.path.join(
+                os.path.dirname(__file__), "..", "data", "layout_racks.csv"
+            )
+        ),
+        help="CSV com rack, largura, profundidade, altura, n_celulas."
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int, default=None,
+        help="Número de processos (padrão: núcleos disponíveis)."
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    _, produtos = load_data_from_sqlite(args.db)
+    racks = carregar_layout(args.layout)
+
+    inicio = time.time()
+    resumo, detalhe = alocar_multi_rack(produtos, racks, args.workers)
+    print(f"{len(racks)} racks resolvidos em {time.time() - inicio:.2f}s")
+
+    data_dir = os.path.dirname(args.db)
+    resumo_path = os.path.join(data_dir, "resumo_alocacao_racks.csv")
+    detalhe_path = os.path.join(data_dir, "alocacao_racks_detalhada.csv")
+    resumo.to_csv(resumo_path, index=False)
+    detalhe.to_csv(detalhe_path, index=False)
+    print(f"Resumo salvo em: {resumo_path}")
+    print(f"Detalhe salvo em: {detalhe_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,21 @@
 import math
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from matplotlib.patches import Patch
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 import sqlite3
 import os
 import argparse
 
-@dataclass
-class Produto:
-    largura: int
-    profundidade: int
-    altura: int
+from banco_produtos import conectar, salvar_alocacao
+import armazenamento_parquet
+from armazenamento_parquet import AlocacaoLonga, posicoes_ocupadas, total_por_produto
+from mochila import mochila_colunas
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Celula:
     largura: int
     profundidade: int
@@ -24,59 +24,426 @@ class Celula:
 # Dimensões padrão da célula
 dimensoes_celula = Celula(largura=1760, profundidade=400, altura=850)
 
+CORES = [
+    'tab:blue','tab:orange','tab:green','tab:red',
+    'tab:purple','tab:brown','tab:pink','tab:gray',
+    'tab:olive','tab:cyan'
+]
+
+COLUNAS_PRODUTOS = [
+    'sku', 'nome_produto', 'categoria',
+    'largura_mm', 'profundidade_mm', 'altura_mm', 'qtd_vendida_30d'
+]
+
+
+@dataclass
+class TabelaProdutos:
+    """
+    Tabela colunar de produtos: uma posição por SKU em cada array.
+    `dims` tem forma (n, 3) com largura, profundidade e altura em mm e
+    `categoria` guarda o índice em `categorias`. SKUs com a mesma caixa
+    formam uma classe de dimensão: `dims_classe` tem as caixas distintas e
+    `classe` aponta a classe de cada SKU.
+    """
+    sku: np.ndarray
+    nome: np.ndarray
+    categoria: np.ndarray
+    categorias: List[str]
+    dims: np.ndarray
+    demanda: np.ndarray
+    dims_classe: Optional[np.ndarray] = None
+    classe: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        if self.classe is None:
+            self.dims_classe, self.classe = classes_dimensao(self.dims)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'TabelaProdutos':
+        codigos, categorias = pd.factorize(df['categoria'])
+        return cls(
+            sku=df['sku'].to_numpy(dtype=object),
+            nome=df['nome_produto'].to_numpy(dtype=object),
+            categoria=codigos.astype(np.int32),
+            categorias=list(categorias),
+            dims=df[['largura_mm', 'profundidade_mm', 'altura_mm']]
+                .to_numpy(dtype=np.int32),
+            demanda=df['qtd_vendida_30d'].to_numpy(dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.sku)
+
+    def __getitem__(self, idx) -> 'TabelaProdutos':
+        return TabelaProdutos(
+            sku=self.sku[idx],
+            nome=self.nome[idx],
+            categoria=self.categoria[idx],
+            categorias=self.categorias,
+            dims=self.dims[idx],
+            demanda=self.demanda[idx],
+            dims_classe=self.dims_classe,
+            classe=self.classe[idx],
+        )
+
+    @property
+    def largura(self) -> np.ndarray:
+        return self.dims[:, 0]
+
+    @property
+    def profundidade(self) -> np.ndarray:
+        return self.dims[:, 1]
+
+    @property
+    def altura(self) -> np.ndarray:
+        return self.dims[:, 2]
+
+    def label(self, j: int) -> str:
+        return f"{self.sku[j]} - {self.nome[j]}"
+
+    def cor(self, j: int) -> str:
+        return CORES[j % len(CORES)]
+
+    def por_classe(self, valores_classe: np.ndarray) -> np.ndarray:
+        """Espalha um valor calculado por classe de dimensão para cada SKU."""
+        return valores_classe[self.classe]
+
+    def cap_per_col(self, celula: Optional[Celula] = None) -> np.ndarray:
+        """Unidades por coluna de cada produto (0 quando não cabe na célula)."""
+        return self.por_classe(cap_per_col_classes(self.dims_classe, celula))
+
+
+def classes_dimensao(dims: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Agrupa caixas iguais: retorna as dimensões distintas (k, 3) e o índice
+    da classe de cada linha. As três medidas são empacotadas em uma única
+    chave inteira, o que evita o `np.unique(axis=0)` lexicográfico.
+    """
+    dims = np.asarray(dims, dtype=np.int64).reshape(-1, 3)
+    chave = (dims[:, 0] << 40) | (dims[:, 1] << 20) | dims[:, 2]
+    unicas, inverso = np.unique(chave, return_inverse=True)
+    dims_classe = np.stack(
+        [unicas >> 40, (unicas >> 20) & 0xFFFFF, unicas & 0xFFFFF], axis=1
+    ).astype(np.int32)
+    return dims_classe, inverso.astype(np.int32).ravel()
+
+
+def cap_per_col_classes(
+    dims_classe: np.ndarray,
+    celula: Optional[Celula] = None
+) -> np.ndarray:
+    """Unidades por coluna de cada classe de dimensão, uma única vez por caixa."""
+    cel = celula or dimensoes_celula
+    cap = (cel.profundidade // dims_classe[:, 1]) * (cel.altura // dims_classe[:, 2])
+    return np.where(dims_classe[:, 0] <= cel.largura, cap, 0).astype(np.int64)
+
 
 def allocate_grouped_cells(
-    produtos_info: List[Tuple[str, Produto, str]],
-    demands: List[int],
-    n_cells: int
-) -> List[List[Tuple[str, int, int, int]]]:
+    produtos: TabelaProdutos,
+    n_cells: int,
+    larguras_livres: Optional[List[int]] = None,
+    celula: Optional[Celula] = None,
+    demands: Optional[np.ndarray] = None
+) -> np.ndarray:
     """
     Lógica original de alocação: preenche colunas inteiras de cada produto em cada célula.
+    `larguras_livres` permite partir de células já parcialmente ocupadas,
+    `celula` troca as dimensões padrão (racks com células de outro tamanho) e
+    `demands` substitui a demanda da tabela (ex.: demanda residual).
+    Retorna a matriz (n_cells, n_produtos) de unidades alocadas.
     """
-    cel = dimensoes_celula
-    rem_width = [cel.largura] * n_cells
-    rem_dem = demands.copy()
-    cells_alloc = [[None] * len(produtos_info) for _ in range(n_cells)]
-
-    for idx, (label, prod, _) in enumerate(produtos_info):
-        rows = cel.profundidade // prod.profundidade
-        layers = cel.altura // prod.altura
-        cap_per_col = rows * layers
-        total = demands[idx]
+    cel = celula or dimensoes_celula
+    if larguras_livres is None:
+        rem_width = [cel.largura] * n_cells
+    else:
+        rem_width = list(larguras_livres)
+    rem_dem = (produtos.demanda if demands is None else np.asarray(demands)).tolist()
+    caps = produtos.cap_per_col(cel).tolist()
+    larguras = produtos.largura.tolist()
+    alloc = np.zeros((n_cells, len(produtos)), dtype=np.int64)
+
+    for idx in range(len(produtos)):
+        cap_per_col = caps[idx]
+        largura = larguras[idx]
         for c in range(n_cells):
             demand = rem_dem[idx]
             if demand <= 0 or cap_per_col == 0:
-                alloc = 0
-            else:
-                max_cols = rem_width[c] // prod.largura
-                needed_cols = min(math.ceil(demand / cap_per_col), max_cols)
-                alloc = min(demand, needed_cols * cap_per_col)
-                rem_width[c] -= needed_cols * prod.largura
-                rem_dem[idx] -= alloc
-            cells_alloc[c][idx] = (label, total, alloc, total - alloc)
+                break
+            max_cols = rem_width[c] // largura
+            needed_cols = min(-(-demand // cap_per_col), max_cols)
+            qtd = min(demand, needed_cols * cap_per_col)
+            rem_width[c] -= needed_cols * largura
+            rem_dem[idx] -= qtd
+            alloc[c, idx] = qtd
+
+    return alloc
+
 
-    return cells_alloc
+def allocate_knapsack_cells(
+    produtos: TabelaProdutos,
+    n_cells: int,
+    larguras_livres: Optional[List[int]] = None,
+    celula: Optional[Celula] = None,
+    demands: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Mesma entrada e saída de `allocate_grouped_cells`, mas cada célula, em
+    ordem, recebe a combinação de colunas que guarda mais volume na largura
+    livre (mochila exata). Cada produto oferece suas colunas cheias e, se a
+    demanda restante não fecha uma coluna, uma coluna parcial.
+    """
+    cel = celula or dimensoes_celula
+    rem_width = [cel.largura] * n_cells if larguras_livres is None else list(larguras_livres)
+    rem_dem = (produtos.demanda if demands is None else np.asarray(demands)).astype(np.int64).copy()
+    caps = produtos.cap_per_col(cel)
+    larguras = produtos.largura.astype(np.int64)
+    volume = produtos.dims.prod(axis=1, dtype=np.int64)
+    alloc = np.zeros((n_cells, len(produtos)), dtype=np.int64)
+
+    for c in range(n_cells):
+        ativos = np.flatnonzero((rem_dem > 0) & (caps > 0) & (larguras <= rem_width[c]))
+        if len(ativos) == 0:
+            break
+        cheias = rem_dem[ativos] // caps[ativos]
+        parcial = rem_dem[ativos] % caps[ativos]
+        _, cols = mochila_colunas(
+            np.r_[larguras[ativos], larguras[ativos]],
+            np.r_[caps[ativos] * volume[ativos], parcial * volume[ativos]],
+            np.r_[cheias, (parcial > 0).astype(np.int64)],
+            rem_width[c],
+        )
+        n = len(ativos)
+        qtd = cols[:n] * caps[ativos] + cols[n:] * parcial
+        alloc[c, ativos] = qtd
+        rem_dem[ativos] -= qtd
+        rem_width[c] -= int(((cols[:n] + cols[n:]) * larguras[ativos]).sum())
+
+    return alloc
+
+
+@dataclass
+class ResultadoMinimo:
+    """
+    Saída de `allocate_min_cells`: `allocation` é uma `AlocacaoLonga`
+    (o número de células cresce com o catálogo, e a matriz densa
+    células x produtos não cabe na memória); `colunas` é (n_celulas, n_larguras)
+    com as colunas de cada largura distinta por célula; `limite_l1`/
+    `limite_l2` são os limites inferiores de células e `nao_cabem` os
+    produtos com demanda que não cabem numa célula.
+    """
+    n_celulas: int
+    limite_l1: int
+    limite_l2: int
+    allocation: AlocacaoLonga
+    colunas: np.ndarray
+    nao_cabem: np.ndarray
+
+
+def limites_inferiores(
+    larguras: np.ndarray,
+    contagens: np.ndarray,
+    capacidade: int
+) -> Tuple[int, int]:
+    """
+    Limites L1 (volume) e L2 de Martello & Toth para o bin packing de
+    `contagens[j]` itens de largura `larguras[j]` em células de largura
+    `capacidade`. L2 testa como K cada largura distinta até C/2.
+    """
+    w = np.asarray(larguras, dtype=np.int64)
+    n = np.asarray(contagens, dtype=np.int64)
+    C = int(capacidade)
+    l1 = int(-(-(w * n).sum() // C))
+
+    ks = np.unique(np.r_[0, w[2 * w <= C]])[:, None]
+    j1 = w > C - ks
+    j2 = ~j1 & (2 * w > C)
+    j3 = (2 * w <= C) & (w >= ks)
+    n2, s2 = (n * j2).sum(axis=1), (n * w * j2).sum(axis=1)
+    s3 = (n * w * j3).sum(axis=1)
+    sobra = -(-(s3 - (n2 * C - s2)) // C)
+    l2 = int(((n * j1).sum(axis=1) + n2 + np.maximum(sobra, 0)).max())
+    return l1, max(l1, l2)
+
+
+def ffd_colunas(larguras: np.ndarray, contagens: np.ndarray, capacidade: int) -> np.ndarray:
+    """
+    First-fit decreasing por classe de largura. Itens iguais vão para a
+    primeira célula onde cabem, então cada classe enche as células abertas
+    em ordem e só então abre novas. Retorna (n_celulas, n_classes) com o
+    número de colunas de cada classe em cada célula.
+    """
+    larguras = np.asarray(larguras, dtype=np.int64)
+    contagens = np.asarray(contagens, dtype=np.int64)
+    # cada classe abre no máximo ceil(contagem / por célula) células
+    teto = int((-(-contagens // (capacidade // larguras))).sum())
+    conteudo = np.zeros((teto, len(larguras)), dtype=np.int64)
+    resto = np.full(teto, capacidade, dtype=np.int64)
+    abertas = 0
+    for j in np.argsort(-larguras, kind='stable'):
+        w, falta = int(larguras[j]), int(contagens[j])
+        if falta <= 0:
+            continue
+        cabe = resto[:abertas] // w
+        antes = np.cumsum(cabe) - cabe
+        pega = np.clip(falta - antes, 0, cabe)
+        conteudo[:abertas, j] = pega
+        resto[:abertas] -= pega * w
+        falta -= int(pega.sum())
+        if falta > 0:
+            por_celula = capacidade // w
+            novas = -(-falta // por_celula)
+            pega = np.full(novas, por_celula, dtype=np.int64)
+            pega[-1] = falta - por_celula * (novas - 1)
+            conteudo[abertas:abertas + novas, j] = pega
+            resto[abertas:abertas + novas] -= pega * w
+            abertas += novas
+    return conteudo[:abertas]
+
+
+# células consideradas numa troca da fase de melhoria
+LINHAS_TROCA = 64
+
+
+def _realocar(tentativa: np.ndarray, sobra: np.ndarray, w: np.ndarray, pendentes: List[int]) -> bool:
+    """
+    Coloca as colunas `pendentes` (classes) em `tentativa`, best fit. Uma
+    coluna que não cabe em lugar nenhum troca de lugar com uma mais estreita
+    de outra célula, que volta para a fila; como a coluna da fila fica
+    sempre mais estreita, o processo termina.
+    """
+    while pendentes:
+        j = pendentes.pop()
+        cabe = np.flatnonzero(sobra >= w[j])
+        if len(cabe):
+            destino = cabe[np.argmin(sobra[cabe])]
+            tentativa[destino, j] += 1
+            sobra[destino] -= w[j]
+            continue
+        # troca só nas células com mais sobra, que são as que podem aceitar
+        menores = np.flatnonzero(w < w[j])
+        linhas = np.argpartition(-sobra, min(LINHAS_TROCA, len(sobra)) - 1)[:LINHAS_TROCA]
+        folga = sobra[linhas, None] + w[menores] - w[j]
+        validas = (tentativa[np.ix_(linhas, menores)] > 0) & (folga >= 0) & (sobra[linhas, None] >= 0)
+        if not validas.any():
+            return False
+        folga = np.where(validas, folga, np.iinfo(np.int64).max)
+        r, m = np.unravel_index(np.argmin(folga), folga.shape)
+        destino, troca = linhas[r], menores[m]
+        tentativa[destino, troca] -= 1
+        tentativa[destino, j] += 1
+        sobra[destino] += w[troca] - w[j]
+        pendentes.append(troca)
+    return True
+
+
+def esvaziar_celulas(
+    conteudo: np.ndarray,
+    larguras: np.ndarray,
+    capacidade: int,
+    limite: int = 0,
+    tentativas: int = 32
+) -> np.ndarray:
+    """
+    Fase de melhoria: tenta esvaziar uma das `tentativas` células menos
+    cheias espalhando as colunas dela (maiores primeiro) pelas sobras das
+    outras, com trocas quando uma coluna não cabe direto. Para quando chega
+    em `limite` ou quando nenhuma célula sai numa rodada.
+    """
+    w = np.asarray(larguras, dtype=np.int64)
+    while len(conteudo) > limite:
+        resto = capacidade - conteudo @ w
+        removeu = False
+        for alvo in np.argsort(resto)[::-1][:tentativas]:
+            if capacidade - resto[alvo] > resto.sum() - resto[alvo]:
+                break
+            tentativa = conteudo.copy()
+            sobra = resto.copy()
+            # a célula alvo fica de fora: sobra negativa nunca recebe nada
+            sobra[alvo] = -1
+            # fila em largura crescente: pop() tira a mais larga primeiro
+            colunas = np.repeat(np.arange(len(w)), tentativa[alvo])
+            pendentes = colunas[np.argsort(w[colunas], kind='stable')].tolist()
+            tentativa[alvo] = 0
+            if _realocar(tentativa, sobra, w, pendentes):
+                conteudo = np.delete(tentativa, alvo, axis=0)
+                removeu = True
+                break
+        if not removeu:
+            break
+    return conteudo
+
+
+def allocate_min_cells(
+    produtos: TabelaProdutos,
+    celula: Optional[Celula] = None,
+    melhorar: bool = True
+) -> ResultadoMinimo:
+    """
+    Modo inverso de `allocate_grouped_cells`: quantas células bastam para a
+    demanda de 30 dias. Cada produto precisa de ceil(demanda / cap_per_col)
+    colunas inteiras da sua largura, e as colunas são itens de um bin
+    packing 1D na largura da célula, resolvido por classe de largura com
+    FFD mais a fase de melhoria. A última coluna de cada produto leva só o
+    que sobra da demanda.
+    """
+    cel = celula or dimensoes_celula
+    caps = produtos.cap_per_col(cel)
+    demanda = np.maximum(produtos.demanda, 0)
+    cols = np.where(caps > 0, -(-demanda // np.maximum(caps, 1)), 0)
+    nao_cabem = np.flatnonzero((caps == 0) & (demanda > 0))
+
+    usados = np.flatnonzero(cols > 0)
+    larguras, classe = np.unique(produtos.largura[usados], return_inverse=True)
+    larguras = larguras.astype(np.int64)
+    contagens = np.bincount(classe, weights=cols[usados], minlength=len(larguras)).astype(np.int64)
+
+    l1, l2 = limites_inferiores(larguras, contagens, cel.largura) if len(larguras) else (0, 0)
+    conteudo = ffd_colunas(larguras, contagens, cel.largura)
+    if melhorar and len(conteudo) > l2:
+        conteudo = esvaziar_celulas(conteudo, larguras, cel.largura, l2)
+
+    # colunas de cada classe pelos SKUs da classe, em ordem: a lista de
+    # colunas (classe, sku) casa com as células repetidas classe a classe
+    n_celulas = len(conteudo)
+    skus = usados[np.argsort(classe, kind='stable')]
+    sku_col = np.repeat(skus, cols[skus])
+    qtd = np.repeat(caps[skus], cols[skus])
+    qtd[np.cumsum(cols[skus]) - 1] = demanda[skus] - (cols[skus] - 1) * caps[skus]
+    celula_col = np.repeat(np.tile(np.arange(n_celulas), len(larguras)), conteudo.T.ravel())
+    # uma linha por (célula, sku): soma as colunas do SKU na mesma célula
+    chave, inverso = np.unique(celula_col * len(produtos) + sku_col, return_inverse=True)
+    allocation = AlocacaoLonga(
+        n_celulas=n_celulas,
+        n_produtos=len(produtos),
+        celula=chave // len(produtos),
+        produto=chave % len(produtos),
+        qtd=np.bincount(inverso, weights=qtd).astype(np.int64),
+    )
+
+    return ResultadoMinimo(
+        n_celulas=n_celulas,
+        limite_l1=l1,
+        limite_l2=l2,
+        allocation=allocation,
+        colunas=conteudo,
+        nao_cabem=nao_cabem,
+    )
 
 
 def allocate_grouped_cells_mix(
-    produtos_info: List[Tuple[str, Produto, str]],
-    demands: List[int],
+    produtos: TabelaProdutos,
     n_cells: int,
     strategy: str
-) -> List[List[Tuple[str, int, int, int]]]:
+) -> np.ndarray:
     """
     Lógica alternativa 'mix': não insere nada nas células inicialmente.
     """
-    return [
-        [(label, demands[idx], 0, demands[idx])
-         for idx, (label, prod, _) in enumerate(produtos_info)]
-        for _ in range(n_cells)
-    ]
+    return np.zeros((n_cells, len(produtos)), dtype=np.int64)
 
 
 def plot_allocation_3d(
-    allocation: List[List[Tuple[str, int, int, int]]],
-    produtos_info: List[Tuple[str, Produto, str]],
+    allocation: np.ndarray,
+    produtos: TabelaProdutos,
     n_cells: int
 ):
     cel = dimensoes_celula
@@ -84,8 +451,14 @@ def plot_allocation_3d(
     n_rows = int(math.ceil(n_cells / n_cols))
     fig = plt.figure(figsize=(6 * n_cols + 3, 6 * n_rows))
 
-    global_handles = []
-    global_labels = []
+    rows_arr = produtos.por_classe(cel.profundidade // produtos.dims_classe[:, 1])
+    layers_arr = produtos.por_classe(cel.altura // produtos.dims_classe[:, 2])
+    caps = produtos.cap_per_col(cel)
+    safe_caps = np.maximum(caps, 1)
+    global_handles = [
+        Patch(facecolor=produtos.cor(j), edgecolor='black') for j in range(len(produtos))
+    ]
+    global_labels = [produtos.label(j) for j in range(len(produtos))]
 
     for i in range(n_cells):
         ax = fig.add_subplot(n_rows, n_cols, i + 1, projection='3d')
@@ -98,49 +471,33 @@ def plot_allocation_3d(
         ax.set_ylabel('Y (mm)')
         ax.set_zlabel('Z (mm)')
 
-        needed_cols_list = []
-        total_width = 0
-        for j, (_, total, alloc, _) in enumerate(allocation[i]):
-            prod = produtos_info[j][1]
-            rows = cel.profundidade // prod.profundidade
-            layers = cel.altura // prod.altura
-            cap_per_col = rows * layers
-            cols = math.ceil(alloc / cap_per_col) if cap_per_col else 0
-            needed_cols_list.append(cols)
-            total_width += cols * prod.largura
-
+        needed_cols = np.where(caps > 0, -(-allocation[i] // safe_caps), 0)
+        total_width = int((needed_cols * produtos.largura).sum())
         x_offset = (cel.largura - total_width) / 2
 
-        for j, (label, total, alloc, _) in enumerate(allocation[i]):
-            prod = produtos_info[j][1]
-            color = produtos_info[j][2]
-            cols = needed_cols_list[j]
-
-            if label not in global_labels:
-                global_handles.append(Patch(facecolor=color, edgecolor='black'))
-                global_labels.append(label)
-
-            if alloc <= 0 or cols == 0:
-                continue
-
-            rows = cel.profundidade // prod.profundidade
-            layers = cel.altura // prod.altura
+        for j in np.flatnonzero((allocation[i] > 0) & (needed_cols > 0)):
+            largura, profundidade, altura = produtos.dims[j].tolist()
+            alloc = int(allocation[i, j])
+            cols = int(needed_cols[j])
+            rows = int(rows_arr[j])
+            layers = int(layers_arr[j])
+            color = produtos.cor(j)
             count = 0
             y_offset = 0
 
             for layer in range(layers):
-                z = layer * prod.altura
+                z = layer * altura
                 for col in range(cols):
-                    x = x_offset + col * prod.largura
+                    x = x_offset + col * largura
                     for row in range(rows):
                         if count >= alloc:
                             break
-                        y = y_offset + row * prod.profundidade
+                        y = y_offset + row * profundidade
                         ax.bar3d(
                             x, y, z,
-                            prod.largura,
-                            prod.profundidade,
-                            prod.altura,
+                            largura,
+                            profundidade,
+                            altura,
                             color=color,
                             edgecolor='black',
                             linewidth=0.5,
@@ -152,7 +509,7 @@ def plot_allocation_3d(
                 if count >= alloc:
                     break
 
-            x_offset += cols * prod.largura
+            x_offset += cols * largura
 
     fig.legend(global_handles, global_labels, title='Produtos',
                loc='upper right', bbox_to_anchor=(1.02, 0.98))
@@ -160,65 +517,86 @@ def plot_allocation_3d(
 
 
 def save_summary_csv(
-    allocation: List[List[Tuple[str, int, int, int]]],
-    produtos_info: List[Tuple[str, Produto, str]],
+    allocation,
+    produtos: TabelaProdutos,
     n_cells: int,
     db_path: str
 ):
-    skus = [info[0].split(' - ')[0] for info in produtos_info]
-    nomes = [info[0].split(' - ')[1] for info in produtos_info]
-    total_dem = [allocation[0][j][1] for j in range(len(skus))]
-    total_alloc = [sum(allocation[i][j][2] for i in range(n_cells)) for j in range(len(skus))]
-
-    rows = []
-    for j, (sku, nome) in enumerate(zip(skus, nomes)):
-        falt = total_dem[j] - total_alloc[j]
-        row = {
-            'sku': sku,
-            'nome_produto': nome,
-            'total_necessario': total_dem[j],
-            'total_alocado': total_alloc[j],
-            'total_que_nao_coube': falt
-        }
-        for i in range(n_cells):
-            row[f'celula_{i+1}'] = allocation[i][j][2]
-        rows.append(row)
-
-    detail_df = pd.DataFrame(rows)
+    total_alloc = total_por_produto(allocation, len(produtos))
+    detail_df = pd.DataFrame({
+        'sku': produtos.sku,
+        'nome_produto': produtos.nome,
+        'total_necessario': produtos.demanda,
+        'total_alocado': total_alloc,
+        'total_que_nao_coube': produtos.demanda - total_alloc,
+    })
     data_dir = os.path.dirname(db_path)
     output_path = os.path.join(data_dir, "resumo_alocacao_detalhada.csv")
     detail_df.to_csv(output_path, index=False)
     print(f"Tabela detalhada salva em: {output_path}")
 
+    # posição por célula em formato longo (sku, celula, qtd): uma coluna por
+    # célula não escala com catálogos grandes
+    longa_path = armazenamento_parquet.caminho_alocacao(data_dir)
+    if armazenamento_parquet.PYARROW_AVAILABLE:
+        armazenamento_parquet.salvar_alocacao(allocation, produtos, longa_path)
+    else:
+        armazenamento_parquet.alocacao_longa(allocation, produtos).to_csv(longa_path, index=False)
+    print(f"Alocação por célula salva em: {longa_path}")
+
+
+def salvar_alocacao_sqlite(
+    allocation,
+    produtos: TabelaProdutos,
+    n_cells: int,
+    db_path: str
+):
+    """
+    Persiste a alocação (sku, celula, qtd) e o retrato dos produtos usados,
+    base para a realocação incremental da próxima execução.
+    """
+    celulas, idx, qtd = posicoes_ocupadas(allocation)
+    alocacao_rows = zip(produtos.sku[idx], (celulas + 1).tolist(), qtd.tolist())
+    produtos_rows = zip(
+        produtos.sku,
+        produtos.largura.tolist(),
+        produtos.profundidade.tolist(),
+        produtos.altura.tolist(),
+        produtos.demanda.tolist(),
+        [n_cells] * len(produtos)
+    )
+
+    conn = conectar(db_path)
+    salvar_alocacao(conn, alocacao_rows, produtos_rows)
+    conn.close()
+    print(f"Alocação salva no banco: {db_path}")
+
 
 def load_data_from_sqlite(
     db_path: str
-) -> Tuple[Celula, List[Tuple[str, Produto, str]], List[int]]:
+) -> Tuple[Celula, TabelaProdutos]:
     conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("SELECT * FROM produtos", conn)
+    df = pd.read_sql_query(
+        f"SELECT {', '.join(COLUNAS_PRODUTOS)} FROM produtos", conn
+    )
     conn.close()
+    return dimensoes_celula, TabelaProdutos.from_dataframe(df)
 
-    colors = [
-        'tab:blue','tab:orange','tab:green','tab:red',
-        'tab:purple','tab:brown','tab:pink','tab:gray',
-        'tab:olive','tab:cyan'
-    ]
-    produtos_info: List[Tuple[str, Produto, str]] = []
-    demands: List[int] = []
-    for idx, row in df.iterrows():
-        label = f"{row['sku']} - {row['nome_produto']}"
-        produtos_info.append((
-            label,
-            Produto(
-                largura=int(row['largura_mm']),
-                profundidade=int(row['profundidade_mm']),
-                altura=int(row['altura_mm'])
-            ),
-            colors[idx % len(colors)]
-        ))
-        demands.append(int(row['qtd_vendida_30d']))
-
-    return dimensoes_celula, produtos_info, demands
+
+def carregar_alocacao_sqlite(
+    produtos: TabelaProdutos,
+    n_cells: int,
+    db_path: str
+) -> np.ndarray:
+    """Reconstrói a matriz (n_cells, n_produtos) a partir da tabela alocacao."""
+    conn = sqlite3.connect(db_path)
+    df = pd.read_sql_query("SELECT sku, celula, qtd FROM alocacao", conn)
+    conn.close()
+    allocation = np.zeros((n_cells, len(produtos)), dtype=np.int64)
+    pos = pd.Index(produtos.sku).get_indexer(df['sku'])
+    ok = (pos >= 0) & (df['celula'].to_numpy() <= n_cells)
+    allocation[df['celula'].to_numpy()[ok] - 1, pos[ok]] = df['qtd'].to_numpy()[ok]
+    return allocation
 
 
 def parse_args():
@@ -246,38 +624,64 @@ def parse_args():
     )
     parser.add_argument(
         "--model",
-        choices=['default','mix'], default='mix',
-        help="Modelo de alocação: default = original, mix = nova lógica"
+        choices=['default','mix','minimo','mochila'], default='mix',
+        help="Modelo de alocação: default = original, mix = nova lógica, "
+             "minimo = menor número de células para toda a demanda (ignora -c), "
+             "mochila = combinação de colunas ótima em volume por célula"
+    )
+    parser.add_argument(
+        "--sem-grafico",
+        action="store_true",
+        help="Não desenha a alocação 3D"
     )
     parser.add_argument(
         "--n_produtos",
         type=int, default=None,
         help="Número de produtos a considerar do início da lista"
     )
+    parser.add_argument(
+        "--parquet",
+        type=str, default=None,
+        help="Lê o catálogo deste arquivo Parquet em vez do SQLite"
+    )
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
-    celula, produtos_info, demands = load_data_from_sqlite(args.db)
+    if args.parquet:
+        celula, produtos = armazenamento_parquet.carregar_tabela_parquet(args.parquet)
+    else:
+        celula, produtos = load_data_from_sqlite(args.db)
 
     # Limita número de produtos se solicitado
     if args.n_produtos is not None:
-        produtos_info = produtos_info[:args.n_produtos]
-        demands = demands[:args.n_produtos]
+        produtos = produtos[:args.n_produtos]
 
     if args.model == 'mix':
         allocation = allocate_grouped_cells_mix(
-            produtos_info, demands, args.cells, args.strategy
+            produtos, args.cells, args.strategy
         )
+    elif args.model == 'minimo':
+        resultado = allocate_min_cells(produtos, celula)
+        allocation = resultado.allocation
+        args.cells = resultado.n_celulas
+        print(f"Células necessárias: {resultado.n_celulas} "
+              f"(limites inferiores L1={resultado.limite_l1}, L2={resultado.limite_l2})")
+        if len(resultado.nao_cabem):
+            print(f"{len(resultado.nao_cabem)} produtos não cabem em uma célula")
+    elif args.model == 'mochila':
+        allocation = allocate_knapsack_cells(produtos, args.cells, celula=celula)
     else:
-        allocation = allocate_grouped_cells(
-            produtos_info, demands, args.cells
-        )
-
-    plot_allocation_3d(allocation, produtos_info, args.cells)
-    save_summary_csv(allocation, produtos_info, args.cells, args.db)
-    plt.show()
+        allocation = allocate_grouped_cells(produtos, args.cells)
+
+    if not args.sem_grafico:
+        densa = allocation.densa() if isinstance(allocation, AlocacaoLonga) else allocation
+        plot_allocation_3d(densa, produtos, args.cells)
+    save_summary_csv(allocation, produtos, args.cells, args.db)
+    salvar_alocacao_sqlite(allocation, produtos, args.cells, args.db)
+    if not args.sem_grafico:
+        plt.show()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,259 @@
+"""
+Alocação online: itens chegam um a um na doca e cada chegada recebe uma
+posição na hora, sem recalcular a alocação inteira.
+
+A largura livre de cada célula fica num índice ordenado de pares
+(sobra, célula) num `SortedList`; a célula com menor sobra que comporta as
+colunas novas sai de um `bisect_left` (best fit) e cada ajuste de sobra é
+uma remoção e uma inserção, todos O(log n). Colunas do SKU que ficaram pela metade
+são completadas antes de abrir colunas novas. As colocações são somadas à
+tabela `alocacao` do SQLite, a cada chegada ou em lotes.
+"""
+import os
+import time
+import argparse
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from alocacao_nas_celulas import Celula, dimensoes_celula, load_data_from_sqlite
+from banco_produtos import conectar, somar_alocacao
+
+try:
+    from sortedcontainers import SortedList
+    SORTEDCONTAINERS_AVAILABLE = True
+except ImportError:
+    SORTEDCONTAINERS_AVAILABLE = False
+
+    class SortedList:
+        """
+        Substituto com lista simples e `bisect`: mesma interface, mas cada
+        inserção ou remoção desloca a lista (O(n) por ajuste).
+        """
+
+        def __init__(self, itens=()):
+            self._itens = sorted(itens)
+
+        def bisect_left(self, valor):
+            return bisect_left(self._itens, valor)
+
+        def add(self, valor):
+            insort(self._itens, valor)
+
+        def remove(self, valor):
+            del self._itens[bisect_left(self._itens, valor)]
+
+        def __getitem__(self, i):
+            return self._itens[i]
+
+        def __len__(self):
+            return len(self._itens)
+
+
+class IndiceSobras:
+    """
+    Larguras livres das células em ordem, para busca best fit. Com
+    sortedcontainers busca e ajuste são O(log n); sem ele o ajuste é O(n).
+    """
+
+    def __init__(self, sobras: Sequence[int]):
+        self.sobra = list(sobras)
+        self.ordem = SortedList((s, c) for c, s in enumerate(self.sobra))
+
+    def melhor(self, largura: int) -> Optional[int]:
+        """Célula com a menor sobra >= `largura`, ou None."""
+        i = self.ordem.bisect_left((largura, -1))
+        return self.ordem[i][1] if i < len(self.ordem) else None
+
+    def maior(self) -> int:
+        return self.ordem[-1][1]
+
+    def ajustar(self, celula: int, sobra: int):
+        self.ordem.remove((self.sobra[celula], celula))
+        self.ordem.add((sobra, celula))
+        self.sobra[celula] = sobra
+
+
+@dataclass
+class Colocacao:
+    sku: str
+    posicoes: List[Tuple[int, int]] = field(default_factory=list)  # (celula, qtd), 1-based
+    nao_alocado: int = 0
+
+
+class AlocadorOnline:
+    def __init__(
+        self,
+        produtos,
+        n_celulas: int,
+        celula: Optional[Celula] = None,
+        conn=None,
+        lote: int = 1
+    ):
+        """
+        `produtos` é uma `TabelaProdutos`; `conn` (de `banco_produtos.conectar`)
+        recebe as colocações, gravadas a cada `lote` chegadas.
+        """
+        self.celula = celula or dimensoes_celula
+        self.n_celulas = n_celulas
+        caps = produtos.cap_per_col(self.celula).tolist()
+        self.produtos: Dict[str, Tuple[int, int]] = dict(
+            zip(produtos.sku, zip(produtos.largura.tolist(), caps))
+        )
+        self._retrato = {
+            sku: (int(w), int(d), int(h), int(dem))
+            for sku, (w, d, h), dem in zip(produtos.sku, produtos.dims.tolist(), produtos.demanda.tolist())
+        }
+        self.indice = IndiceSobras([self.celula.largura] * n_celulas)
+        # vagas em colunas já abertas: sku -> {celula: unidades}
+        self.abertas: Dict[str, Dict[int, int]] = {}
+        self.conn = conn
+        self.lote = lote
+        self._pendentes: List[Tuple[str, int, int]] = []
+
+    def carregar(self, alocacao: Dict[str, Dict[int, int]]):
+        """Parte de uma alocação existente (sku -> {celula 0-based: qtd})."""
+        for sku, celulas in alocacao.items():
+            if sku not in self.produtos:
+                continue
+            largura, cap = self.produtos[sku]
+            for c, qtd in celulas.items():
+                if c >= self.n_celulas or cap == 0:
+                    continue
+                cols = -(-qtd // cap)
+                self.indice.ajustar(c, self.indice.sobra[c] - cols * largura)
+                if cols * cap > qtd:
+                    self.abertas.setdefault(sku, {})[c] = cols * cap - qtd
+
+    def alocar(self, sku: str, qtd: int) -> Colocacao:
+        """
+        Posiciona `qtd` unidades do SKU: completa as colunas abertas, depois
+        abre as colunas que faltam na célula de menor sobra que comporta
+        todas; se nenhuma comporta, divide a partir da célula mais livre.
+        """
+        if sku not in self.produtos:
+            raise KeyError(f"SKU desconhecido: {sku}")
+        largura, cap = self.produtos[sku]
+        resultado = Colocacao(sku)
+        falta = qtd
+        if cap == 0:
+            resultado.nao_alocado = falta
+            return resultado
+
+        vagas = self.abertas.get(sku)
+        if vagas:
+            for c in list(vagas):
+                q = min(vagas[c], falta)
+                vagas[c] -= q
+                if vagas[c] == 0:
+                    del vagas[c]
+                resultado.posicoes.append((c + 1, q))
+                falta -= q
+                if falta == 0:
+                    break
+
+        while falta > 0:
+            cols = -(-falta // cap)
+            c = self.indice.melhor(cols * largura)
+            if c is None:
+                c = self.indice.maior()
+                cols = self.indice.sobra[c] // largura
+                if cols == 0:
+                    break
+            q = min(falta, cols * cap)
+            self.indice.ajustar(c, self.indice.sobra[c] - cols * largura)
+            if cols * cap > q:
+                vagas = self.abertas.setdefault(sku, {})
+                vagas[c] = vagas.get(c, 0) + cols * cap - q
+            resultado.posicoes.append((c + 1, q))
+            falta -= q
+
+        resultado.nao_alocado = falta
+        if self.conn is not None and resultado.posicoes:
+            self._pendentes.extend((sku, c, q) for c, q in resultado.posicoes)
+            if len(self._pendentes) >= self.lote:
+                self.gravar()
+        return resultado
+
+    def gravar(self):
+        """Soma as colocações pendentes à tabela `alocacao`."""
+        if not self._pendentes:
+            return
+        skus = {sku for sku, _, _ in self._pendentes}
+        somar_alocacao(
+            self.conn,
+            self._pendentes,
+            [(sku, *self._retrato[sku], self.n_celulas) for sku in skus],
+        )
+        self._pendentes = []
+
+    def ocupacao(self) -> float:
+        usado = self.n_celulas * self.celula.largura - sum(self.indice.sobra)
+        return usado / (self.n_celulas * self.celula.largura)
+
+
+def main():
+    from realocacao_incremental import carregar_alocacao_anterior
+
+    parser = argparse.ArgumentParser(
+        description="Alocação online: posiciona cada chegada sem recalcular a alocação"
+    )
+    parser.add_argument(
+        "--db", type=str,
+        default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "produtos.db"))
+    )
+    parser.add_argument("-c", "--cells", type=int, default=None,
+                        help="Número de células (padrão: o da última alocação salva)")
+    parser.add_argument("--sku", type=str, help="SKU que chegou")
+    parser.add_argument("--qtd", type=int, default=1)
+    parser.add_argument("--simular", type=int, default=0,
+                        help="Simula N chegadas aleatórias e mede a latência")
+    parser.add_argument("--lote", type=int, default=1,
+                        help="Chegadas por transação no SQLite")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    celula, produtos = load_data_from_sqlite(args.db)
+    _, alocacao, n_anterior = carregar_alocacao_anterior(args.db)
+    n_celulas = args.cells or n_anterior or 3
+    conn = conectar(args.db)
+    try:
+        alocador = AlocadorOnline(produtos, n_celulas, celula, conn, args.lote)
+        alocador.carregar(alocacao)
+
+        if args.sku:
+            try:
+                r = alocador.alocar(args.sku, args.qtd)
+            except KeyError as e:
+                parser.error(e.args[0])
+            alocador.gravar()
+            for c, q in r.posicoes:
+                print(f"{args.sku}: {q} un. na célula {c}")
+            if r.nao_alocado:
+                print(f"{args.sku}: {r.nao_alocado} un. sem espaço")
+
+        if args.simular:
+            rng = np.random.default_rng(args.seed)
+            idx = rng.integers(0, len(produtos), args.simular)
+            qtds = rng.integers(1, 13, args.simular)
+            tempos = np.empty(args.simular)
+            sem_espaco = 0
+            for k, (j, q) in enumerate(zip(idx.tolist(), qtds.tolist())):
+                inicio = time.perf_counter()
+                r = alocador.alocar(produtos.sku[j], q)
+                tempos[k] = time.perf_counter() - inicio
+                sem_espaco += r.nao_alocado
+            alocador.gravar()
+            us = tempos * 1e6
+            print(f"{args.simular} chegadas em {n_celulas} células: "
+                  f"p50 {np.percentile(us, 50):.0f} us, p99 {np.percentile(us, 99):.0f} us, "
+                  f"máx {us.max():.0f} us; ocupação {alocador.ocupacao():.1%}, "
+                  f"{sem_espaco} un. sem espaço")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,7 @@ import json
 warnings.filterwarnings('ignore')
 
 # GPU heuristic pack function (importa direto do módulo)
-from run_packing_gpu import gpu_heuristic_pack
+from run_packing_gpu import gpu_heuristic_pack, filter_collisions, BACKEND_FITNESS
 
 st.set_page_config(page_title="GPU Packing UI", layout="wide")
 st.title("Empacotamento 3D com GPU")
@@ -36,6 +36,8 @@ else:
 # GPU Heuristic parameters
 st.sidebar.subheader("Parâmetros da heurística GPU")
 pop_size = st.sidebar.slider("Tamanho da população", min_value=64, max_value=16384, value=2048, step=64)
+seed = st.sidebar.number_input("Seed", min_value=0, value=0, step=1)
+st.sidebar.caption(f"Fitness calculada em: {BACKEND_FITNESS}")
 
 if st.button("Executar GPU Heurística"):
     # Prepara dimensões e quantidades dos blocos
@@ -47,7 +49,10 @@ if st.button("Executar GPU Heurística"):
         block_dims.extend([dims] * qtd)
     
     # Executa heurística GPU
-    placements = gpu_heuristic_pack(dx, dy, dz, block_dims, pop_size=pop_size, N=total_blocks)
+    placements = gpu_heuristic_pack(dx, dy, dz, block_dims, pop_size=pop_size, N=total_blocks,
+                                    seed=int(seed))
+    # a fitness só confere os limites do contêiner: sobreposições saem aqui
+    placements = filter_collisions(placements, block_dims, dx, dy, dz)
     count = len(placements)
     st.success(f"Solução encontrou {count} blocos de {total_blocks} solicitados!")
 
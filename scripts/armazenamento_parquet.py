@@ -0,0 +1,136 @@
+import os
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Linhas por row group: cada grupo guarda min/max por coluna, o que permite
+# pular grupos inteiros nos filtros por célula ou SKU
+LINHAS_POR_GRUPO = 64_000
+
+
+def _exigir_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow não está instalado. Instale com 'pip install pyarrow'.")
+
+
+@dataclass
+class AlocacaoLonga:
+    """
+    Alocação em formato longo: `qtd[k]` unidades do produto `produto[k]` na
+    célula `celula[k]` (0-based). A memória acompanha as posições ocupadas,
+    não células x produtos, o que importa quando o número de células cresce
+    junto com o catálogo.
+    """
+    n_celulas: int
+    n_produtos: int
+    celula: np.ndarray
+    produto: np.ndarray
+    qtd: np.ndarray
+
+    def densa(self) -> np.ndarray:
+        """Matriz (n_celulas, n_produtos), só para gráficos e casos pequenos."""
+        allocation = np.zeros((self.n_celulas, self.n_produtos), dtype=np.int64)
+        np.add.at(allocation, (self.celula, self.produto), self.qtd)
+        return allocation
+
+
+def posicoes_ocupadas(allocation) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(celula 0-based, produto, qtd) de uma matriz densa ou `AlocacaoLonga`."""
+    if isinstance(allocation, AlocacaoLonga):
+        ok = allocation.qtd > 0
+        return allocation.celula[ok], allocation.produto[ok], allocation.qtd[ok]
+    celulas, idx = np.nonzero(allocation)
+    return celulas, idx, allocation[celulas, idx]
+
+
+def total_por_produto(allocation, n_produtos: int) -> np.ndarray:
+    _, idx, qtd = posicoes_ocupadas(allocation)
+    return np.bincount(idx, weights=qtd, minlength=n_produtos).astype(np.int64)
+
+
+def alocacao_longa(allocation, produtos) -> pd.DataFrame:
+    """
+    Converte a alocação (matriz (n_cells, n_produtos) ou `AlocacaoLonga`)
+    para o formato longo (sku, celula, qtd), só com as posições ocupadas,
+    ordenado por célula.
+    """
+    celulas, idx, qtd = posicoes_ocupadas(allocation)
+    ordem = np.argsort(celulas, kind='stable')
+    return pd.DataFrame({
+        'sku': produtos.sku[idx[ordem]],
+        'celula': (celulas[ordem] + 1).astype(np.int32),
+        'qtd': qtd[ordem].astype(np.int64),
+    })
+
+
+def salvar_parquet(df: pd.DataFrame, caminho: str, ordenar_por: Optional[List[str]] = None):
+    """Grava um DataFrame em Parquet, ordenado para estatísticas úteis por grupo."""
+    _exigir_pyarrow()
+    if ordenar_por:
+        df = df.sort_values(ordenar_por, kind='stable')
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(tabela, caminho, row_group_size=LINHAS_POR_GRUPO)
+
+
+def salvar_alocacao(allocation, produtos, caminho: str):
+    salvar_parquet(alocacao_longa(allocation, produtos), caminho, ['celula', 'sku'])
+
+
+def ler_alocacao(
+    caminho: str,
+    skus: Optional[Sequence[str]] = None,
+    celulas: Optional[Sequence[int]] = None
+) -> pd.DataFrame:
+    """
+    Lê a alocação longa com filtros empurrados para o leitor (row groups
+    fora do filtro nem são descompactados) e arquivo mapeado em memória.
+    """
+    _exigir_pyarrow()
+    filtros = []
+    if celulas is not None:
+        filtros.append(('celula', 'in', list(celulas)))
+    if skus is not None:
+        filtros.append(('sku', 'in', list(skus)))
+    return pq.read_table(
+        caminho, filters=filtros or None, memory_map=True
+    ).to_pandas()
+
+
+def ler_catalogo(
+    caminho: str,
+    colunas: Optional[List[str]] = None,
+    skus: Optional[Sequence[str]] = None,
+    categorias: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """Lê o catálogo em Parquet só com as colunas e linhas pedidas."""
+    _exigir_pyarrow()
+    filtros = []
+    if skus is not None:
+        filtros.append(('sku', 'in', list(skus)))
+    if categorias is not None:
+        filtros.append(('categoria', 'in', list(categorias)))
+    return pq.read_table(
+        caminho, columns=colunas, filters=filtros or None, memory_map=True
+    ).to_pandas()
+
+
+def carregar_tabela_parquet(caminho: str):
+    """Equivalente a `load_data_from_sqlite` lendo o catálogo em Parquet."""
+    from alocacao_nas_celulas import COLUNAS_PRODUTOS, TabelaProdutos, dimensoes_celula
+    df = ler_catalogo(caminho, colunas=COLUNAS_PRODUTOS)
+    return dimensoes_celula, TabelaProdutos.from_dataframe(df)
+
+
+def caminho_alocacao(data_dir: str) -> str:
+    """Arquivo da alocação longa: Parquet quando disponível, senão CSV."""
+    nome = "alocacao_longa.parquet" if PYARROW_AVAILABLE else "alocacao_longa.csv"
+    return os.path.join(data_dir, nome)
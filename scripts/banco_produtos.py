@@ -0,0 +1,213 @@
+import sqlite3
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+import pandas as pd
+
+# Colunas da tabela produtos, na ordem do CSV simulado
+COLUNAS = [
+    'sku', 'nome_produto', 'categoria', 'preco',
+    'qtd_vendida_90d', 'qtd_vendida_30d',
+    'largura_m', 'profundidade_m', 'altura_m',
+    'largura_mm', 'profundidade_mm', 'altura_mm',
+    'volume_embalado_m3', 'peso_embalado_kg',
+    'volume_mm3', 'volume_litros', 'volume_m3',
+]
+
+# Índices secundários de produtos: entram no ESQUEMA e são recriados no fim
+# de uma carga em tabela vazia
+INDICES_PRODUTOS = {
+    'idx_produtos_categoria': "CREATE INDEX IF NOT EXISTS idx_produtos_categoria ON produtos (categoria)",
+    'idx_produtos_demanda': "CREATE INDEX IF NOT EXISTS idx_produtos_demanda ON produtos (qtd_vendida_30d)",
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produtos (
+    sku                TEXT PRIMARY KEY,
+    nome_produto       TEXT NOT NULL,
+    categoria          TEXT NOT NULL,
+    preco              REAL,
+    qtd_vendida_90d    INTEGER,
+    qtd_vendida_30d    INTEGER NOT NULL CHECK (qtd_vendida_30d >= 0),
+    largura_m          REAL,
+    profundidade_m     REAL,
+    altura_m           REAL,
+    largura_mm         INTEGER NOT NULL CHECK (largura_mm > 0),
+    profundidade_mm    INTEGER NOT NULL CHECK (profundidade_mm > 0),
+    altura_mm          INTEGER NOT NULL CHECK (altura_mm > 0),
+    volume_embalado_m3 REAL,
+    peso_embalado_kg   REAL,
+    volume_mm3         REAL,
+    volume_litros      REAL,
+    volume_m3          REAL
+);
+""" + "".join(f"{ddl};\n" for ddl in INDICES_PRODUTOS.values()) + """
+CREATE TABLE IF NOT EXISTS alocacao (
+    sku    TEXT    NOT NULL,
+    celula INTEGER NOT NULL,
+    qtd    INTEGER NOT NULL CHECK (qtd > 0),
+    PRIMARY KEY (sku, celula)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_alocacao_celula ON alocacao (celula);
+
+CREATE TABLE IF NOT EXISTS alocacao_produtos (
+    sku             TEXT PRIMARY KEY,
+    largura_mm      INTEGER NOT NULL,
+    profundidade_mm INTEGER NOT NULL,
+    altura_mm       INTEGER NOT NULL,
+    qtd_vendida_30d INTEGER NOT NULL,
+    n_celulas       INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -200000",
+    "PRAGMA mmap_size = 268435456",
+]
+
+
+def conectar(db_path: str) -> sqlite3.Connection:
+    """Abre o banco com os pragmas de carga e garante o esquema tipado."""
+    conn = sqlite3.connect(db_path)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    migrar_esquema(conn)
+    return conn
+
+
+def _tem_pk(conn: sqlite3.Connection, tabela: str) -> bool:
+    info = conn.execute(f"PRAGMA table_info({tabela})").fetchall()
+    return any(col[5] for col in info)
+
+
+def migrar_esquema(conn: sqlite3.Connection):
+    """
+    Cria as tabelas e índices. Tabelas antigas sem chave primária (gravadas
+    via `to_sql` ou pela primeira versão da alocação) são convertidas
+    preservando os dados.
+    """
+    existentes = {
+        r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    }
+    legado = [t for t in ('produtos', 'alocacao', 'alocacao_produtos')
+              if t in existentes and not _tem_pk(conn, t)]
+    with conn:
+        for tabela in legado:
+            conn.execute(f"ALTER TABLE {tabela} RENAME TO {tabela}_legado")
+    conn.executescript(ESQUEMA)
+    with conn:
+        for tabela in legado:
+            colunas = [
+                r[1] for r in conn.execute(f"PRAGMA table_info({tabela})")
+            ]
+            antigas = {
+                r[1] for r in conn.execute(f"PRAGMA table_info({tabela}_legado)")
+            }
+            comuns = ", ".join(c for c in colunas if c in antigas)
+            conn.execute(
+                f"INSERT OR REPLACE INTO {tabela} ({comuns}) "
+                f"SELECT {comuns} FROM {tabela}_legado"
+            )
+            conn.execute(f"DROP TABLE {tabela}_legado")
+
+
+def _linhas(df: pd.DataFrame) -> Iterator[tuple]:
+    # colunas convertidas de uma vez para listas Python; NaN vira NULL no bind
+    return zip(*[df[c].tolist() for c in COLUNAS])
+
+
+def upsert_produtos(
+    conn: sqlite3.Connection,
+    blocos: Iterable[pd.DataFrame],
+    remover_ausentes: bool = True
+) -> int:
+    """
+    Grava os blocos de produtos com INSERT ... ON CONFLICT(sku) DO UPDATE em
+    uma única transação; linhas idênticas às do banco não são reescritas.
+    Em tabela vazia os índices secundários são recriados só no final.
+    Com `remover_ausentes`, SKUs que não vieram na carga são apagados,
+    deixando a tabela igual ao arquivo de origem.
+    Retorna o número de linhas gravadas.
+    """
+    colunas = ", ".join(COLUNAS)
+    marcadores = ", ".join("?" for _ in COLUNAS)
+    outras = [c for c in COLUNAS if c != 'sku']
+    sql = (
+        f"INSERT INTO produtos ({colunas}) VALUES ({marcadores}) "
+        f"ON CONFLICT(sku) DO UPDATE SET "
+        + ", ".join(f"{c} = excluded.{c}" for c in outras)
+        + " WHERE " + " OR ".join(f"{c} IS NOT excluded.{c}" for c in outras)
+    )
+    vazia = conn.execute("SELECT 1 FROM produtos LIMIT 1").fetchone() is None
+    vistos = set()
+    total = 0
+    with conn:
+        if vazia:
+            for nome in INDICES_PRODUTOS:
+                conn.execute(f"DROP INDEX IF EXISTS {nome}")
+        for df in blocos:
+            conn.executemany(sql, _linhas(df))
+            if remover_ausentes:
+                vistos.update(df['sku'].tolist())
+            total += len(df)
+        if remover_ausentes and not vazia:
+            ausentes = [
+                (sku,) for (sku,) in conn.execute("SELECT sku FROM produtos")
+                if sku not in vistos
+            ]
+            conn.executemany("DELETE FROM produtos WHERE sku = ?", ausentes)
+        for ddl in INDICES_PRODUTOS.values():
+            conn.execute(ddl)
+    return total
+
+
+def salvar_alocacao(
+    conn: sqlite3.Connection,
+    alocacao_rows: Iterable[Tuple[str, int, int]],
+    produtos_rows: Iterable[Sequence]
+):
+    """Substitui a última alocação (sku, celula, qtd) e o retrato dos produtos."""
+    with conn:
+        conn.execute("DELETE FROM alocacao")
+        conn.execute("DELETE FROM alocacao_produtos")
+        conn.executemany("INSERT INTO alocacao VALUES (?, ?, ?)", alocacao_rows)
+        conn.executemany(
+            "INSERT INTO alocacao_produtos VALUES (?, ?, ?, ?, ?, ?)", produtos_rows
+        )
+
+
+def somar_alocacao(
+    conn: sqlite3.Connection,
+    alocacao_rows: Iterable[Tuple[str, int, int]],
+    produtos_rows: Iterable[Sequence] = ()
+):
+    """
+    Acrescenta quantidades (sku, celula, qtd) à alocação salva sem apagar o
+    resto, para colocações feitas uma a uma. O retrato só ganha os SKUs que
+    ainda não tinha.
+    """
+    with conn:
+        conn.executemany(
+            "INSERT INTO alocacao VALUES (?, ?, ?) "
+            "ON CONFLICT(sku, celula) DO UPDATE SET qtd = qtd + excluded.qtd",
+            alocacao_rows
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO alocacao_produtos VALUES (?, ?, ?, ?, ?, ?)",
+            produtos_rows
+        )
+
+
+def produto_por_sku(conn: sqlite3.Connection, sku: str) -> tuple:
+    """Busca pontual pela chave primária (índice B-tree, O(log n))."""
+    return conn.execute(
+        f"SELECT {', '.join(COLUNAS)} FROM produtos WHERE sku = ?", (sku,)
+    ).fetchone()
+
+
+def alocacao_por_celula(conn: sqlite3.Connection, celula: int) -> List[Tuple[str, int]]:
+    return conn.execute(
+        "SELECT sku, qtd FROM alocacao WHERE celula = ?", (celula,)
+    ).fetchall()
@@ -1,24 +1,21 @@
-
-import pandas as pd
-import sqlite3
 import os
+import time
+
+from ingestao_csv import ingerir
 
 # Caminho do CSV de entrada
 caminho_csv = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "produtos_simulados.csv"))
 
-# Leitura da base simulada
-df = pd.read_csv(caminho_csv)
-
 # Caminho do banco SQLite de saída
 caminho_db = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "produtos.db"))
 
-# Conexão com SQLite
-conn = sqlite3.connect(caminho_db)
+# Linhas rejeitadas pela validação
+caminho_rejeitos = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "produtos_rejeitados.csv"))
 
-# Exporta os dados para a tabela 'produtos'
-df.to_sql("produtos", conn, if_exists="replace", index=False)
+inicio = time.time()
 
-# Fecha a conexão
-conn.close()
+# Leitura em blocos, normalização de unidades, validação e upsert em uma única transação
+stats = ingerir(caminho_csv, db_path=caminho_db, rejeitos_path=caminho_rejeitos)
 
-print(f"Dados carregados com sucesso para o banco SQLite: {caminho_db}")
+print(f"{stats['validas']} produtos carregados no banco SQLite: {caminho_db} "
+      f"({stats['rejeitadas']} rejeitados, {time.time() - inicio:.2f}s)")
@@ -3,20 +3,24 @@ import math
 import numpy as np
 import matplotlib.pyplot as plt
 
+from mochila import mochila_colunas
+
 # Parâmetros
 csv_path = r"A:\_Profissional\__VOO SOLO\estoque\data\produtos_simulados.csv"
 n_cells = 10
 n_produtos = 12
 
-# Carrega dados
+# Carrega só as colunas usadas e os N primeiros produtos
 try:
-    df = pd.read_csv(csv_path)
+    df = pd.read_csv(
+        csv_path,
+        usecols=['sku','nome_produto','largura_mm','profundidade_mm','altura_mm','qtd_vendida_30d'],
+        nrows=n_produtos,
+        encoding='utf-8-sig'
+    )
 except Exception as e:
     raise RuntimeError(f"Não conseguiu ler CSV: {e}")
 
-# Limita para N produtos
-df = df.head(n_produtos)
-
 # Extração de dados
 skus = df['sku'].tolist()
 demands = df['qtd_vendida_30d'].astype(int).tolist()
@@ -31,29 +35,33 @@ layers_max = cel_h // min(p.altura_mm for p in produtos)
 
 # Função de alocação (quota mix já validado)
 def alloc_quota(demands, produtos, n_cells):
-    total = demands.copy()
+    """
+    Cada célula recebe a combinação de colunas que guarda mais volume na
+    largura, respeitando a cota por célula e a demanda restante (mochila
+    exata em vez do "maior área de base primeiro").
+    """
+    total = np.array(demands, dtype=np.int64)
+    larguras = np.array([p.largura_mm for p in produtos], dtype=np.int64)
+    caps = np.array([(cel_d // p.profundidade_mm) * (cel_h // p.altura_mm) for p in produtos],
+                    dtype=np.int64)
+    volumes = np.array([p.largura_mm * p.profundidade_mm * p.altura_mm for p in produtos],
+                       dtype=np.int64)
+    quotas = np.array([math.ceil(d / n_cells) for d in demands], dtype=np.int64)
     records = []
     for c in range(n_cells):
-        alloc = [0]*len(produtos)
-        rem_w = cel_w
-        quotas = [math.ceil(d/n_cells) for d in demands]
-        cell_quota = quotas.copy()
-        for _ in range(cols_max):
-            # escolhe SKU de maior área base dentro de quota e demanda
-            best, best_area = None, 0
-            for i, p in enumerate(produtos):
-                rows = cel_d // p.profundidade_mm
-                if total[i]<=0 or cell_quota[i]<=0 or p.largura_mm>rem_w or rows<=0: continue
-                area = p.largura_mm * p.profundidade_mm
-                if area>best_area:
-                    best_area=area; best=i
-            if best is None: break
-            p=produtos[best]
-            rows=cel_d//p.profundidade_mm; layers=cel_h//p.altura_mm
-            cap=rows*layers
-            qty=min(cap, total[best], cell_quota[best])
-            alloc[best]+=qty; total[best]-=qty; cell_quota[best]-=qty; rem_w-=p.largura_mm
-        records.append(alloc)
+        limite = np.where(caps > 0, np.minimum(total, quotas), 0)
+        cheias = limite // np.maximum(caps, 1)
+        parcial = limite - cheias * caps
+        _, cols = mochila_colunas(
+            np.r_[larguras, larguras],
+            np.r_[caps * volumes, parcial * volumes],
+            np.r_[cheias, (parcial > 0).astype(np.int64)],
+            cel_w,
+        )
+        n = len(produtos)
+        alloc = cols[:n] * caps + cols[n:] * parcial
+        total -= alloc
+        records.append(alloc.tolist())
     return records
 
 # Gera alocação
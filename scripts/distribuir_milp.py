@@ -1,8 +1,53 @@
 import json
+import math
 import argparse
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-from pulp import LpProblem, LpMaximize, LpVariable, lpSum, LpBinary, PULP_CBC_CMD
+
+try:
+    from pulp import LpProblem, LpMaximize, LpVariable, lpSum, LpBinary, PULP_CBC_CMD
+    PULP_AVAILABLE = True
+except ImportError:
+    PULP_AVAILABLE = False
+
+@dataclass
+class StatusSolver:
+    """
+    Como terminou uma resolução exata. `status` é 'otimo' (provado pelo
+    limite superior), 'viavel' (parou no limite de tempo com solução),
+    'inviavel' (não existe solução com pelo menos `minimo` blocos) ou
+    'sem_solucao' (parou sem solução nem prova). `limite` é o melhor limite
+    superior provado, em blocos, quando o solver informa.
+    """
+    status: str
+    blocos: int = 0
+    limite: Optional[float] = None
+
+    @property
+    def otimo(self) -> bool:
+        return self.status == 'otimo'
+
+    @property
+    def gap(self) -> Optional[float]:
+        if self.limite is None or not self.blocos:
+            return None
+        return max(0.0, self.limite - self.blocos) / self.blocos
+
+
+def status_por_limite(blocos: int, limite: Optional[float], provado: bool = False) -> StatusSolver:
+    """
+    A contagem é inteira: a solução é ótima quando o limite superior
+    arredondado para baixo não passa dela. O gap relativo padrão dos
+    solvers (1e-4 no HiGHS) não basta para declarar ótimo.
+    """
+    if limite is not None and math.isfinite(limite):
+        provado = provado or math.floor(limite + 1e-6) <= blocos
+    return StatusSolver('otimo' if provado else 'viavel', blocos, limite)
+
 
 class Cuboid:
     def __init__(self, dx: int, dy: int, dz: int):
@@ -72,7 +117,17 @@ class Cuboid:
         plt.close()
 
 
-def solve_packing(dx, dy, dz, orientations, time_limit=None, mip_gap=None, initial_solution=None):
+def solve_packing(dx, dy, dz, orientations, time_limit=None, mip_gap=None, initial_solution=None,
+                  backend='pulp', minimo=0, com_status=False):
+    """
+    `minimo` > 0 exige pelo menos essa quantidade de blocos; com
+    `com_status` devolve (placements, StatusSolver).
+    """
+    if backend == 'highs':
+        return solve_packing_highs(dx, dy, dz, orientations, time_limit, mip_gap,
+                                   minimo, com_status)
+    if not PULP_AVAILABLE:
+        raise RuntimeError("pulp não está instalado. Instale com 'pip install pulp' ou use backend='highs'.")
     prob = LpProblem('3D_Packing', LpMaximize)
     b_vars = {}
     # Define variáveis e warm start
@@ -88,6 +143,8 @@ def solve_packing(dx, dy, dz, orientations, time_limit=None, mip_gap=None, initi
 
     # Objetivo
     prob += lpSum(b_vars.values())
+    if minimo:
+        prob += lpSum(b_vars.values()) >= minimo
 
     # Restrição não sobreposição
     for i in range(dx):
@@ -112,9 +169,104 @@ def solve_packing(dx, dy, dz, orientations, time_limit=None, mip_gap=None, initi
 
     # Extrai solução
     placements = [key for key, var in b_vars.items() if var.value() == 1]
-    return placements
+    if not com_status:
+        return placements
+    # sol_status do PuLP: 1 ótimo, 2 viável (parou no limite), -1 inviável
+    if prob.sol_status == -1:
+        return [], StatusSolver('inviavel')
+    if prob.sol_status == 1 and mip_gap is None:
+        return placements, StatusSolver('otimo', len(placements), len(placements))
+    if placements:
+        return placements, StatusSolver('viavel', len(placements))
+    return placements, StatusSolver('sem_solucao')
+
+def enumerar_posicoes(dx, dy, dz, orientations):
+    """
+    Todas as posições válidas (i, j, k, o) como array (n, 4), geradas por
+    orientação com np.indices em vez de testar célula a célula.
+    """
+    blocos = []
+    for o, (lx, ly, lz) in enumerate(orientations):
+        nx, ny, nz = dx - lx + 1, dy - ly + 1, dz - lz + 1
+        if nx <= 0 or ny <= 0 or nz <= 0:
+            continue
+        ijk = np.indices((nx, ny, nz)).reshape(3, -1).T
+        blocos.append(np.column_stack([ijk, np.full(len(ijk), o)]))
+    if not blocos:
+        return np.empty((0, 4), dtype=np.int64)
+    return np.concatenate(blocos)
+
+
+def matriz_incidencia(posicoes, orientations, dx, dy, dz):
+    """
+    Matriz esparsa CSR (células x posições): A[c, p] = 1 quando a posição p
+    ocupa a célula c. Montada só com aritmética de índices, uma orientação
+    por vez, sem objetos por variável.
+    """
+    from scipy.sparse import csr_matrix
+
+    linhas, colunas = [], []
+    for o, (lx, ly, lz) in enumerate(orientations):
+        sel = np.flatnonzero(posicoes[:, 3] == o)
+        if len(sel) == 0:
+            continue
+        a, b, c = np.indices((lx, ly, lz)).reshape(3, -1)
+        desloc = (a * dy + b) * dz + c
+        base = (posicoes[sel, 0] * dy + posicoes[sel, 1]) * dz + posicoes[sel, 2]
+        linhas.append((base[:, None] + desloc[None, :]).ravel())
+        colunas.append(np.repeat(sel, len(desloc)))
+    linhas = np.concatenate(linhas)
+    colunas = np.concatenate(colunas)
+    dados = np.ones(len(linhas), dtype=np.float64)
+    return csr_matrix((dados, (linhas, colunas)), shape=(dx * dy * dz, len(posicoes)))
+
+
+def solve_packing_highs(dx, dy, dz, orientations, time_limit=None, mip_gap=None, minimo=0,
+                        com_status=False):
+    """
+    Mesmo modelo de `solve_packing`, montado direto como matriz esparsa e
+    resolvido em processo pelo HiGHS (`scipy.optimize.milp`), sem arquivo
+    LP/MPS nem chamada ao CBC. O HiGHS do SciPy não aceita solução inicial;
+    no lugar, `minimo` > 0 exige pelo menos essa quantidade de blocos.
+    Com `com_status` devolve (placements, StatusSolver), com a otimalidade
+    tirada do limite dual do HiGHS.
+    """
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    posicoes = enumerar_posicoes(dx, dy, dz, orientations)
+    if len(posicoes) == 0:
+        status = StatusSolver('inviavel' if minimo else 'otimo', 0, 0)
+        return ([], status) if com_status else []
+    A = matriz_incidencia(posicoes, orientations, dx, dy, dz)
+    options = {'disp': False}
+    if time_limit is not None:
+        options['time_limit'] = time_limit
+    if mip_gap is not None:
+        options['mip_rel_gap'] = mip_gap
+    restricoes = [LinearConstraint(A, -np.inf, 1)]
+    if minimo:
+        restricoes.append(LinearConstraint(np.ones((1, len(posicoes))), minimo, np.inf))
+    res = milp(
+        c=-np.ones(len(posicoes)),
+        constraints=restricoes,
+        integrality=np.ones(len(posicoes)),
+        bounds=Bounds(0, 1),
+        options=options,
+    )
+    if res.x is None:
+        status = StatusSolver('inviavel' if res.status == 2 else 'sem_solucao')
+        return ([], status) if com_status else []
+    placements = [tuple(int(v) for v in p) for p in posicoes[res.x > 0.5]]
+    if not com_status:
+        return placements
+    # o objetivo é minimizar -blocos: o limite dual vem com o sinal trocado
+    limite = -res.mip_dual_bound if res.mip_dual_bound is not None else None
+    return placements, status_por_limite(len(placements), limite)
+
 
 if __name__ == '__main__':
+    from ocupacao_bitset import conflitos
+
     parser = argparse.ArgumentParser()
     parser.add_argument('-a', '--dx', type=int, default=5)
     parser.add_argument('-l', '--dy', type=int, default=5)
@@ -122,6 +274,8 @@ if __name__ == '__main__':
     parser.add_argument('--time-limit', type=float, default=None)
     parser.add_argument('--mip-gap',    type=float, default=None)
     parser.add_argument('--initial-solution', type=str, default=None)
+    parser.add_argument('--backend', choices=['pulp', 'highs'], default='pulp',
+                        help='pulp = PuLP + CBC; highs = matriz esparsa + HiGHS em processo')
     args = parser.parse_args()
 
     orientations = [(1,1,2), (2,1,1), (1,2,1)]
@@ -136,9 +290,14 @@ if __name__ == '__main__':
         orientations,
         time_limit=args.time_limit,
         mip_gap=args.mip_gap,
-        initial_solution=initial
+        initial_solution=initial,
+        backend=args.backend
     )
     print(f"Máximo de blocos 1×1×2 em {args.dx}×{args.dy}×{args.dz}: {len(placements)}")
+    invalidas = conflitos(placements, orientations, args.dx, args.dy, args.dz)
+    if invalidas:
+        print(f"Atenção: {len(invalidas)} posições sobrepostas ou fora do contêiner: "
+              f"{[placements[i] for i in invalidas[:10]]}")
     print("Placements (x, y, z, orientation):", placements)
 
     cubo = Cuboid(args.dx, args.dy, args.dz)
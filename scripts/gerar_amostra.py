@@ -1,13 +1,125 @@
+import os
+import sqlite3
+import argparse
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
 import pandas as pd
 
-# 1. Carrega o CSV
-df = pd.read_csv('produtos_simulados.csv')
+# Limites superiores (exclusivos) das faixas de demanda em 30 dias
+FAIXAS_DEMANDA = [15, 30]
+ROTULOS_FAIXA = ['baixa', 'media', 'alta']
+
+
+def blocos_csv(caminho_csv: str, tamanho_bloco: int = 100_000) -> Iterator[pd.DataFrame]:
+    yield from pd.read_csv(caminho_csv, chunksize=tamanho_bloco, encoding='utf-8-sig')
+
+
+def blocos_sqlite(db_path: str, tamanho_bloco: int = 100_000) -> Iterator[pd.DataFrame]:
+    conn = sqlite3.connect(db_path)
+    try:
+        # ordem fixa pela chave primária para a amostra ser reproduzível
+        yield from pd.read_sql_query(
+            "SELECT * FROM produtos ORDER BY sku", conn, chunksize=tamanho_bloco
+        )
+    finally:
+        conn.close()
+
+
+def estrato(df: pd.DataFrame, faixas: List[int] = FAIXAS_DEMANDA) -> pd.Series:
+    """Rótulo 'categoria|faixa de demanda' de cada linha."""
+    if len(faixas) + 1 == len(ROTULOS_FAIXA):
+        rotulos = np.array(ROTULOS_FAIXA)
+    else:
+        rotulos = np.array([f"faixa_{i}" for i in range(len(faixas) + 1)])
+    faixa = rotulos[np.searchsorted(faixas, df['qtd_vendida_30d'].to_numpy(), side='right')]
+    return df['categoria'].astype(str) + '|' + faixa
+
+
+def _cotas(contagens: Dict[str, int], n: int) -> Dict[str, int]:
+    """Divide `n` entre os estratos proporcionalmente (maiores restos)."""
+    total = sum(contagens.values())
+    if total <= n:
+        return dict(contagens)
+    exato = {e: n * c / total for e, c in contagens.items()}
+    cotas = {e: int(v) for e, v in exato.items()}
+    sobra = n - sum(cotas.values())
+    for e in sorted(exato, key=lambda e: (cotas[e] - exato[e], e))[:sobra]:
+        cotas[e] += 1
+    return cotas
+
+
+def amostrar(
+    blocos: Iterator[pd.DataFrame],
+    n: int,
+    seed: Optional[int] = None,
+    faixas: List[int] = FAIXAS_DEMANDA
+) -> pd.DataFrame:
+    """
+    Amostra estratificada (categoria x faixa de demanda) em uma passada.
+
+    Cada linha recebe uma chave uniforme e cada estrato guarda só as `n`
+    menores chaves vistas até agora (reservatório por chaves aleatórias), então
+    a memória fica limitada a `n` linhas por estrato mais um bloco. No fim, `n`
+    é repartido entre os estratos na proporção do seu tamanho e cada um
+    entrega as menores chaves da sua cota. Mesma seed e mesma fonte dão a
+    mesma amostra, independente do tamanho do bloco.
+    """
+    rng = np.random.default_rng(seed)
+    reservatorio = None
+    contagens: Dict[str, int] = {}
+    for bloco in blocos:
+        bloco = bloco.assign(_estrato=estrato(bloco, faixas), _chave=rng.random(len(bloco)))
+        for e, c in bloco['_estrato'].value_counts().items():
+            contagens[e] = contagens.get(e, 0) + int(c)
+        if reservatorio is not None:
+            bloco = pd.concat([reservatorio, bloco], ignore_index=True)
+        reservatorio = (
+            bloco.sort_values('_chave', kind='stable')
+            .groupby('_estrato', sort=False).head(n)
+        )
+
+    if reservatorio is None:
+        return pd.DataFrame()
+    cotas = _cotas(contagens, n)
+    reservatorio = reservatorio.sort_values('_chave', kind='stable')
+    posicao = reservatorio.groupby('_estrato', sort=False).cumcount()
+    limite = reservatorio['_estrato'].map(cotas)
+    amostra = reservatorio[posicao < limite]
+    return amostra.drop(columns=['_estrato', '_chave']).reset_index(drop=True)
+
+
+def main():
+    data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+    parser = argparse.ArgumentParser(
+        description="Amostra estratificada (categoria x demanda) de um catálogo grande"
+    )
+    parser.add_argument("-n", type=int, default=2, help="Tamanho da amostra")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--csv", type=str, default=os.path.join(data_dir, "produtos_simulados.csv"),
+        help="CSV de origem (lido em blocos)"
+    )
+    parser.add_argument("--db", type=str, default=None, help="Lê a tabela produtos deste SQLite")
+    parser.add_argument(
+        "--faixas", type=str, default=",".join(map(str, FAIXAS_DEMANDA)),
+        help="Limites das faixas de demanda em 30 dias, separados por vírgula"
+    )
+    parser.add_argument("--bloco", type=int, default=100_000, help="Linhas lidas por vez")
+    parser.add_argument(
+        "-o", "--saida", type=str, default=os.path.join(data_dir, "amostra_produtos.csv")
+    )
+    args = parser.parse_args()
 
-# 2. Sorteia 2 linhas aleatórias
-amostra = df.sample(n=2, random_state=42)  # retire random_state ou ajuste conforme necessidade
+    faixas = [int(f) for f in args.faixas.split(",") if f]
+    if args.db:
+        blocos = blocos_sqlite(args.db, args.bloco)
+    else:
+        blocos = blocos_csv(args.csv, args.bloco)
+    amostra = amostrar(blocos, args.n, args.seed, faixas)
+    amostra.to_csv(args.saida, index=False, encoding='utf-8-sig')
+    print(amostra)
 
-# 3. Armazena em novo CSV
-amostra.to_csv('amostra_produtos.csv', index=False)
 
-# (Opcional) exibe na tela
-print(amostra)
+if __name__ == "__main__":
+    main()
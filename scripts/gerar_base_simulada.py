@@ -1,9 +1,23 @@
 import pandas as pd
-import random
 import numpy as np
 import os
-import math
+import time
 import argparse
+from typing import Iterator, Optional
+
+CATEGORIAS = np.array(['Brinquedos', 'Utilidades Domésticas'])
+NOMES_BRINQUEDOS = np.array([
+    'Carrinho de Controle', 'Boneca Interativa', 'Jogo Educativo',
+    'Kit de Pintura', 'Quebra-Cabeça', 'Blocos de Montar',
+    'Carrinho Elétrico', 'Puzzle 3D'
+])
+
+# Pequeno, Médio, Grande: faixa de cada dimensão (m) e média de vendas em 90 dias
+TAMANHOS = np.array(['Pequeno', 'Médio', 'Grande'])
+DIM_MIN_M = np.array([0.05, 0.15, 0.30])
+DIM_MAX_M = np.array([0.20, 0.35, 0.50])
+VENDA_90D = np.array([120, 60, 30])
+
 
 def calcular_volume_disponivel(altura_mm, largura_mm, profundidade_mm):
     volume_mm3 = altura_mm * largura_mm * profundidade_mm
@@ -15,66 +29,83 @@ def calcular_volume_disponivel(altura_mm, largura_mm, profundidade_mm):
         "volume_m3": volume_m3
     }
 
-def gerar_produtos_simulados(n_produtos=30):
-    
-    categorias = ['Brinquedos', 'Utilidades Domésticas']
-    nomes_brinquedos = [
-        'Carrinho de Controle', 'Boneca Interativa', 'Jogo Educativo',
-        'Kit de Pintura', 'Quebra-Cabeça', 'Blocos de Montar',
-        'Carrinho Elétrico', 'Puzzle 3D'
-    ]
-    produtos = []
-    for i in range(n_produtos):
-        sku = f"SKU-{i+1:04d}"
-        categoria = random.choice(categorias)
-        nome = random.choice(nomes_brinquedos) if categoria == 'Brinquedos' else f"Item HD-{i+1}"
-        preco = round(random.uniform(20, 500), 2)
+def gerar_produtos_simulados(
+    n_produtos=30,
+    seed: Optional[int] = None,
+    inicio: int = 0,
+    rng: Optional[np.random.Generator] = None
+) -> pd.DataFrame:
+    """
+    Gera `n_produtos` SKUs de uma vez, com todas as colunas sorteadas em
+    arrays. `inicio` desloca a numeração dos SKUs (geração em blocos) e `rng`
+    permite continuar a mesma sequência aleatória entre blocos.
+    """
+    rng = rng or np.random.default_rng(seed)
+    n = n_produtos
+    numero = np.arange(inicio + 1, inicio + n + 1)
+    numero_str = numero.astype(str)
 
-        # vendas dos últimos 90 dias
-        tamanho = random.choice(['Pequeno', 'Médio', 'Grande'])
-        if tamanho == 'Grande':
-            qtd_venda = np.random.poisson(30)
-        elif tamanho == 'Médio':
-            qtd_venda = np.random.poisson(60)
-        else:
-            qtd_venda = np.random.poisson(120)
+    sku = np.char.add('SKU-', np.char.zfill(numero_str, 4))
+    cat_idx = rng.integers(0, len(CATEGORIAS), n)
+    categoria = CATEGORIAS[cat_idx]
+    nome = np.where(
+        cat_idx == 0,
+        NOMES_BRINQUEDOS[rng.integers(0, len(NOMES_BRINQUEDOS), n)],
+        np.char.add('Item HD-', numero_str)
+    )
+    preco = np.round(rng.uniform(20, 500, n), 2)
 
-        # dimensões em metros
-        largura = round(random.uniform(0.05, 0.5), 3)
-        profundidade = round(random.uniform(0.05, 0.5), 3)
-        altura = round(random.uniform(0.05, 0.5), 3)
-        volume_m3 = largura * profundidade * altura
-        peso = round(volume_m3 * random.uniform(0.5, 2.0), 2)
+    # vendas dos últimos 90 dias dependem do porte do produto
+    tamanho = rng.integers(0, len(TAMANHOS), n)
+    qtd_venda = rng.poisson(VENDA_90D[tamanho])
 
-        produtos.append({
-            'sku': sku,
-            'nome_produto': nome,
-            'categoria': categoria,
-            'preco': preco,
-            'qtd_vendida_90d': int(qtd_venda),
-            'qtd_vendida_30d': int(math.ceil(qtd_venda / 90 * 30)),
-            'largura_m': largura,
-            'profundidade_m': profundidade,
-            'altura_m': altura,
-            'largura_mm': int(largura * 1000),
-            'profundidade_mm': int(profundidade * 1000),
-            'altura_mm': int(altura * 1000),
-            'volume_embalado_m3': round(volume_m3, 6),
-            'peso_embalado_kg': peso,
-        })
+    # dimensões em metros, dentro da faixa do porte
+    lo = DIM_MIN_M[tamanho][:, None]
+    hi = DIM_MAX_M[tamanho][:, None]
+    dims_m = np.round(lo + (hi - lo) * rng.random((n, 3)), 3)
+    largura, profundidade, altura = dims_m.T
+    volume_m3 = largura * profundidade * altura
+    peso = np.round(volume_m3 * rng.uniform(0.5, 2.0, n), 2)
+    dims_mm = np.rint(dims_m * 1000).astype(np.int64)
 
-    df = pd.DataFrame(produtos)
-    vols = df.apply(
-        lambda row: pd.Series(
-            calcular_volume_disponivel(
-                row['altura_mm'],
-                row['largura_mm'],
-                row['profundidade_mm']
-            )
-        ),
-        axis=1
+    df = pd.DataFrame({
+        'sku': sku,
+        'nome_produto': nome,
+        'categoria': categoria,
+        'preco': preco,
+        'qtd_vendida_90d': qtd_venda,
+        'qtd_vendida_30d': -(-qtd_venda * 30 // 90),
+        'largura_m': largura,
+        'profundidade_m': profundidade,
+        'altura_m': altura,
+        'largura_mm': dims_mm[:, 0],
+        'profundidade_mm': dims_mm[:, 1],
+        'altura_mm': dims_mm[:, 2],
+        'volume_embalado_m3': np.round(volume_m3, 6),
+        'peso_embalado_kg': peso,
+    })
+    vols = calcular_volume_disponivel(
+        df['altura_mm'].to_numpy(dtype=np.float64),
+        df['largura_mm'].to_numpy(dtype=np.float64),
+        df['profundidade_mm'].to_numpy(dtype=np.float64)
     )
-    return pd.concat([df, vols], axis=1)
+    for coluna, valores in vols.items():
+        df[coluna] = valores
+    return df
+
+def gerar_em_blocos(
+    n_produtos: int,
+    tamanho_bloco: int = 100_000,
+    seed: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Produz o catálogo em DataFrames de até `tamanho_bloco` linhas, com memória
+    constante. Mesma seed e mesmo tamanho de bloco geram o mesmo catálogo.
+    """
+    rng = np.random.default_rng(seed)
+    for inicio in range(0, n_produtos, tamanho_bloco):
+        n = min(tamanho_bloco, n_produtos - inicio)
+        yield gerar_produtos_simulados(n, inicio=inicio, rng=rng)
 
 def main():
     parser = argparse.ArgumentParser(
@@ -86,14 +117,32 @@ def main():
         default=30,
         help="Número de produtos distintos a gerar"
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Semente para gerar sempre o mesmo catálogo"
+    )
+    parser.add_argument(
+        "--bloco",
+        type=int,
+        default=100_000,
+        help="Linhas geradas e gravadas por vez"
+    )
     args = parser.parse_args()
 
-    df = gerar_produtos_simulados(n_produtos=args.n_produtos)
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
     os.makedirs(base_dir, exist_ok=True)
     caminho_arquivo = os.path.join(base_dir, "produtos_simulados.csv")
-    df.to_csv(caminho_arquivo, index=False, encoding='utf-8-sig')
-    print(f"Base de {args.n_produtos} produtos salva em: {caminho_arquivo}")
+
+    inicio = time.time()
+    for i, df in enumerate(gerar_em_blocos(args.n_produtos, args.bloco, args.seed)):
+        if i == 0:
+            df.to_csv(caminho_arquivo, index=False, encoding='utf-8-sig')
+        else:
+            df.to_csv(caminho_arquivo, index=False, header=False, mode='a', encoding='utf-8')
+    print(f"Base de {args.n_produtos} produtos salva em: {caminho_arquivo} "
+          f"({time.time() - inicio:.2f}s)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,231 @@
+import os
+import time
+import argparse
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from banco_produtos import COLUNAS, conectar, upsert_produtos
+from gerar_base_simulada import calcular_volume_disponivel
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Subconjunto lido do export do ERP; colunas fora daqui são ignoradas na leitura.
+# Inteiros são lidos como float para aceitar vazios e validados depois.
+COLUNAS_ENTRADA: Dict[str, str] = {
+    'sku': 'string',
+    'nome_produto': 'string',
+    'categoria': 'string',
+    'preco': 'float64',
+    'qtd_vendida_90d': 'float64',
+    'qtd_vendida_30d': 'float64',
+    'largura_m': 'float64',
+    'profundidade_m': 'float64',
+    'altura_m': 'float64',
+    'largura_mm': 'float64',
+    'profundidade_mm': 'float64',
+    'altura_mm': 'float64',
+    'peso_embalado_kg': 'float64',
+}
+OBRIGATORIAS = ['sku', 'nome_produto', 'categoria', 'qtd_vendida_30d']
+DIMENSOES = ['largura', 'profundidade', 'altura']
+
+
+def ler_em_blocos(
+    caminho_csv: str,
+    tamanho_bloco: int = 50_000
+) -> Iterator[pd.DataFrame]:
+    """
+    Lê o CSV em blocos só com as colunas declaradas e seus dtypes.
+    Falha cedo se faltar coluna obrigatória ou alguma dimensão (em m ou mm).
+    """
+    cabecalho = set(pd.read_csv(caminho_csv, nrows=0, encoding='utf-8-sig').columns)
+    faltando = [c for c in OBRIGATORIAS if c not in cabecalho]
+    faltando += [
+        f"{d}_mm" for d in DIMENSOES
+        if f"{d}_mm" not in cabecalho and f"{d}_m" not in cabecalho
+    ]
+    if faltando:
+        raise ValueError(f"Colunas ausentes em {caminho_csv}: {', '.join(faltando)}")
+
+    usecols = [c for c in COLUNAS_ENTRADA if c in cabecalho]
+    yield from pd.read_csv(
+        caminho_csv,
+        usecols=usecols,
+        dtype={c: COLUNAS_ENTRADA[c] for c in usecols},
+        chunksize=tamanho_bloco,
+        encoding='utf-8-sig',
+    )
+
+
+def normalizar(bloco: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte unidades (m -> mm quando a coluna em mm falta ou está vazia),
+    recalcula as colunas derivadas e devolve o bloco com as colunas do banco.
+    """
+    df = pd.DataFrame(index=bloco.index)
+    for c in ('sku', 'nome_produto', 'categoria'):
+        df[c] = bloco[c].str.strip()
+    df['preco'] = bloco.get('preco', np.nan)
+    df['qtd_vendida_30d'] = bloco['qtd_vendida_30d']
+    df['qtd_vendida_90d'] = bloco.get('qtd_vendida_90d', np.nan)
+    for d in DIMENSOES:
+        mm = bloco.get(f"{d}_mm", pd.Series(np.nan, index=bloco.index))
+        if f"{d}_m" in bloco:
+            mm = mm.fillna((bloco[f"{d}_m"] * 1000).round())
+        df[f"{d}_mm"] = mm
+        df[f"{d}_m"] = mm / 1000
+    df['peso_embalado_kg'] = bloco.get('peso_embalado_kg', np.nan)
+    df['volume_embalado_m3'] = (
+        df['largura_m'] * df['profundidade_m'] * df['altura_m']
+    ).round(6)
+    vols = calcular_volume_disponivel(
+        df['altura_mm'], df['largura_mm'], df['profundidade_mm']
+    )
+    for coluna, valores in vols.items():
+        df[coluna] = valores
+    return df[COLUNAS]
+
+
+def validar(
+    df: pd.DataFrame,
+    vistos: Optional[Set[str]] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Separa linhas válidas e rejeitadas (com o motivo). Demanda e dimensões
+    são convertidas para int64 depois da validação.
+
+    Vale a primeira ocorrência de cada SKU; `vistos` guarda os SKUs dos
+    blocos anteriores e é atualizado aqui, para que uma repetição em outro
+    bloco também seja rejeitada em vez de sobrescrever a primeira no upsert.
+    """
+    if vistos is None:
+        vistos = set()
+    motivo = pd.Series('', index=df.index, dtype=object)
+    regras = [
+        (df['sku'].isna() | (df['sku'] == ''), 'sku vazio'),
+        (df['nome_produto'].isna() | df['categoria'].isna(), 'nome/categoria vazio'),
+        (df['qtd_vendida_30d'].isna() | (df['qtd_vendida_30d'] < 0), 'demanda inválida'),
+        (df['sku'].duplicated() | df['sku'].isin(vistos), 'sku repetido'),
+    ]
+    regras += [
+        (df[f"{d}_mm"].isna() | (df[f"{d}_mm"] <= 0), f"{d} inválida")
+        for d in DIMENSOES
+    ]
+    for mascara, texto in regras:
+        mascara = mascara.fillna(True).to_numpy(dtype=bool)
+        motivo[mascara & (motivo == '')] = texto
+    vistos.update(df['sku'].dropna())
+
+    ok = (motivo == '').to_numpy()
+    validos = df[ok].copy()
+    for c in ('qtd_vendida_30d', 'largura_mm', 'profundidade_mm', 'altura_mm'):
+        validos[c] = validos[c].round().astype(np.int64)
+    rejeitados = df[~ok].assign(motivo=motivo[~ok])
+    return validos, rejeitados
+
+
+def ingerir(
+    caminho_csv: str,
+    db_path: Optional[str] = None,
+    parquet_path: Optional[str] = None,
+    rejeitos_path: Optional[str] = None,
+    tamanho_bloco: int = 50_000,
+    remover_ausentes: bool = True
+) -> Dict[str, int]:
+    """
+    Lê, normaliza e valida o CSV bloco a bloco, gravando os válidos no
+    SQLite (upsert) e/ou em um arquivo Parquet e os rejeitados em CSV.
+    A memória fica limitada ao tamanho do bloco mais o conjunto de SKUs
+    vistos, usado para rejeitar SKUs repetidos entre blocos.
+    """
+    if parquet_path and not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow não está instalado. Instale com 'pip install pyarrow'.")
+    if rejeitos_path and os.path.exists(rejeitos_path):
+        os.remove(rejeitos_path)
+
+    stats = {'lidas': 0, 'validas': 0, 'rejeitadas': 0}
+    writer = None
+    primeiro_rejeito = True
+    vistos: Set[str] = set()
+
+    def blocos_validos():
+        nonlocal writer, primeiro_rejeito
+        for bruto in ler_em_blocos(caminho_csv, tamanho_bloco):
+            validos, rejeitados = validar(normalizar(bruto), vistos)
+            stats['lidas'] += len(bruto)
+            stats['validas'] += len(validos)
+            stats['rejeitadas'] += len(rejeitados)
+            if rejeitos_path and len(rejeitados):
+                rejeitados.to_csv(
+                    rejeitos_path, index=False,
+                    mode='w' if primeiro_rejeito else 'a', header=primeiro_rejeito
+                )
+                primeiro_rejeito = False
+            if parquet_path:
+                tabela = pa.Table.from_pandas(validos, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(parquet_path, tabela.schema)
+                writer.write_table(tabela)
+            yield validos
+
+    try:
+        if db_path:
+            conn = conectar(db_path)
+            upsert_produtos(conn, blocos_validos(), remover_ausentes)
+            conn.close()
+        else:
+            for _ in blocos_validos():
+                pass
+    finally:
+        if writer is not None:
+            writer.close()
+    return stats
+
+
+def main():
+    data_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+    parser = argparse.ArgumentParser(
+        description="Ingestão em blocos de exports de produtos (CSV) para SQLite/Parquet"
+    )
+    parser.add_argument(
+        "csv", nargs='?',
+        default=os.path.join(data_dir, "produtos_simulados.csv"),
+        help="CSV de entrada"
+    )
+    parser.add_argument("--db", type=str, default=os.path.join(data_dir, "produtos.db"))
+    parser.add_argument("--parquet", type=str, default=None, help="Grava também em Parquet")
+    parser.add_argument("--sem-sqlite", action="store_true", help="Não grava no SQLite")
+    parser.add_argument(
+        "--rejeitos", type=str,
+        default=os.path.join(data_dir, "produtos_rejeitados.csv"),
+        help="CSV com as linhas rejeitadas e o motivo"
+    )
+    parser.add_argument("--bloco", type=int, default=50_000, help="Linhas por bloco")
+    parser.add_argument(
+        "--manter-ausentes", action="store_true",
+        help="Não apaga do banco SKUs que não vieram no arquivo"
+    )
+    args = parser.parse_args()
+
+    inicio = time.time()
+    stats = ingerir(
+        args.csv,
+        db_path=None if args.sem_sqlite else args.db,
+        parquet_path=args.parquet,
+        rejeitos_path=args.rejeitos,
+        tamanho_bloco=args.bloco,
+        remover_ausentes=not args.manter_ausentes,
+    )
+    print(f"{stats['lidas']} linhas lidas, {stats['validas']} válidas, "
+          f"{stats['rejeitadas']} rejeitadas em {time.time() - inicio:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
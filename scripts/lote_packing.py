@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Empacotamento em lote: muitos pares (contêiner, orientações) resolvidos de
+uma vez, para perguntas do tipo "quantos X cabem em cada um destes 500
+tamanhos".
+
+Cada tarefa é levada a uma forma canônica antes de resolver: entre as 6
+permutações de eixos escolhe-se a que dá o menor (contêiner, orientações
+ordenadas). Contêineres girados, orientações em outra ordem ou repetidas
+caem na mesma chave, e cada chave é resolvida uma vez só num pool de
+processos. Os resultados saem à medida que terminam (`as_completed`) e são
+repassados a todas as tarefas que compartilham a chave, com as posições
+levadas de volta aos eixos e índices de orientação de cada uma.
+"""
+import csv
+import json
+import time
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from itertools import permutations
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from portfolio_packing import limite_volume
+
+BACKENDS = ['greedy', 'milp', 'cpsat', 'portfolio']
+PERMUTACOES = list(permutations(range(3)))
+
+Dims = Tuple[int, int, int]
+
+
+@dataclass
+class Tarefa:
+    container: Dims
+    orientations: List[Dims]
+    id: Optional[str] = None
+
+
+@dataclass
+class Resultado:
+    indice: int             # posição da tarefa na lista de entrada
+    id: Optional[str]
+    container: Dims
+    count: int
+    method: str
+    otimo: bool
+    tempo_s: float          # tempo de solução da chave canônica
+    compartilhado: bool     # resultado reaproveitado de outra tarefa equivalente
+    placements: List[Tuple[int, int, int, int]] = field(default_factory=list)
+
+
+def orientacoes_bloco(dims: Dims) -> List[Dims]:
+    """Todas as rotações distintas de uma caixa (até 6)."""
+    return sorted({tuple(dims[i] for i in p) for p in PERMUTACOES})
+
+
+def canonica(container: Dims, orientations: Sequence[Dims]):
+    """
+    Devolve (chave, permutação): a chave é (contêiner, orientações) na
+    permutação de eixos lexicograficamente menor; a permutação p leva o
+    eixo k da chave ao eixo p[k] da tarefa.
+    """
+    melhor = None
+    for p in PERMUTACOES:
+        chave = (
+            tuple(container[i] for i in p),
+            tuple(sorted({tuple(o[i] for i in p) for o in orientations})),
+        )
+        if melhor is None or chave < melhor[0]:
+            melhor = (chave, p)
+    return melhor
+
+
+def _desfazer(placements, chave, p, orientations):
+    """Leva posições (x, y, z, o) da chave canônica para os eixos da tarefa."""
+    indice = {tuple(o): i for i, o in reversed(list(enumerate(orientations)))}
+    mapa = []
+    for dims in chave[1]:
+        original = [0, 0, 0]
+        for k in range(3):
+            original[p[k]] = dims[k]
+        mapa.append(indice[tuple(original)])
+    saida = []
+    for c0, c1, c2, o in placements:
+        pos = [0, 0, 0]
+        pos[p[0]], pos[p[1]], pos[p[2]] = c0, c1, c2
+        saida.append((pos[0], pos[1], pos[2], mapa[o]))
+    return saida
+
+
+def _resolver(chave, backend, tempo, seed, threads):
+    """Executa no processo do pool: resolve uma chave canônica."""
+    import random
+
+    (dx, dy, dz), orientations = chave
+    block_dims = [tuple(o) for o in orientations]
+    inicio = time.perf_counter()
+    otimo = False
+    if not block_dims or all(
+        lx > dx or ly > dy or lz > dz for lx, ly, lz in block_dims
+    ):
+        return [], 'vazio', True, 0.0
+    if backend == 'greedy':
+        from run_packing_gpu import greedy_pack
+        teto = limite_volume(dx, dy, dz, block_dims)
+        placements, rodada = [], 0
+        # reinicia com outras sementes enquanto sobra orçamento
+        while True:
+            random.seed(seed + rodada)
+            atual = greedy_pack(dx, dy, dz, block_dims)
+            if len(atual) > len(placements):
+                placements = atual
+            rodada += 1
+            if len(placements) >= teto or time.perf_counter() - inicio >= tempo:
+                break
+        otimo = len(placements) >= teto
+    elif backend == 'milp' and importlib.util.find_spec('scipy'):
+        from distribuir_milp import solve_packing_highs
+        placements, status = solve_packing_highs(dx, dy, dz, block_dims, time_limit=tempo,
+                                                 com_status=True)
+        otimo = status.otimo
+    elif backend == 'milp':
+        from distribuir_milp import solve_packing
+        placements, status = solve_packing(dx, dy, dz, block_dims, time_limit=tempo,
+                                           com_status=True)
+        otimo = status.otimo
+    elif backend == 'cpsat':
+        from run_packing_ortools import ortools_pack
+        placements, status = ortools_pack(dx, dy, dz, block_dims, time_limit=tempo,
+                                          threads=threads, com_status=True)
+        otimo = status.otimo
+    elif backend == 'portfolio':
+        from portfolio_packing import BACKENDS as PORTFOLIO, portfolio_pack
+        melhor = portfolio_pack(dx, dy, dz, block_dims, tempo, PORTFOLIO, seed, threads)
+        placements, otimo = melhor['placements'], melhor['otimo']
+        backend = f"portfolio:{melhor['method']}"
+    else:
+        raise ValueError(f"Backend desconhecido: {backend}")
+    placements = [tuple(int(v) for v in pl) for pl in placements]
+    return placements, backend, otimo, time.perf_counter() - inicio
+
+
+def resolver_lote(
+    tarefas: Sequence[Tarefa],
+    backend: str = 'milp',
+    tempo: float = 60.0,
+    workers: Optional[int] = None,
+    seed: int = 0,
+    threads: int = 1,
+    com_posicoes: bool = False
+) -> Iterator[Resultado]:
+    """
+    Resolve as tarefas num pool de `workers` processos e gera um `Resultado`
+    por tarefa na ordem em que as chaves canônicas terminam. `tempo` é o
+    limite por chave; `threads` vale para o CP-SAT de cada processo.
+    """
+    grupos: Dict[tuple, List[Tuple[int, tuple]]] = {}
+    for i, t in enumerate(tarefas):
+        chave, p = canonica(tuple(t.container), t.orientations)
+        grupos.setdefault(chave, []).append((i, p))
+
+    # chaves maiores primeiro, para não ficarem sozinhas no fim do lote
+    ordem = sorted(grupos, key=lambda c: -c[0][0] * c[0][1] * c[0][2])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {
+            pool.submit(_resolver, chave, backend, tempo, seed, threads): chave
+            for chave in ordem
+        }
+        for futuro in as_completed(futuros):
+            chave = futuros[futuro]
+            placements, metodo, otimo, t = futuro.result()
+            for n, (i, p) in enumerate(grupos[chave]):
+                tarefa = tarefas[i]
+                yield Resultado(
+                    indice=i,
+                    id=tarefa.id,
+                    container=tuple(tarefa.container),
+                    count=len(placements),
+                    method=metodo,
+                    otimo=otimo,
+                    tempo_s=round(t, 3),
+                    compartilhado=n > 0,
+                    placements=(
+                        _desfazer(placements, chave, p, tarefa.orientations)
+                        if com_posicoes else []
+                    ),
+                )
+
+
+def _dims(texto: str) -> Dims:
+    return tuple(int(v) for v in texto.lower().replace('x', ',').split(','))
+
+
+def ler_tarefas(caminho: str, bloco: Dims) -> List[Tarefa]:
+    """
+    Lê tarefas de um JSON (lista ou uma por linha) com `container` e,
+    opcionalmente, `orientations` e `id`; ou de um CSV com colunas dx, dy,
+    dz (e `id`). Sem orientações, valem as rotações de `bloco`.
+    """
+    padrao = orientacoes_bloco(bloco)
+    if caminho.endswith('.csv'):
+        with open(caminho, newline='', encoding='utf-8') as f:
+            return [
+                Tarefa((int(r['dx']), int(r['dy']), int(r['dz'])), padrao, r.get('id'))
+                for r in csv.DictReader(f)
+            ]
+    with open(caminho, encoding='utf-8') as f:
+        texto = f.read().strip()
+    if texto.startswith('['):
+        itens = json.loads(texto)
+    else:
+        itens = [json.loads(linha) for linha in texto.splitlines() if linha.strip()]
+    return [
+        Tarefa(
+            tuple(item['container']),
+            [tuple(o) for o in item.get('orientations', padrao)],
+            item.get('id'),
+        )
+        for item in itens
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Empacotamento em lote: deduplica tarefas equivalentes e resolve em paralelo"
+    )
+    parser.add_argument('--tarefas', type=str,
+                        help='Arquivo .json/.jsonl ou .csv (dx,dy,dz[,id]) com as tarefas')
+    parser.add_argument('--sizes', type=str,
+                        help='Contêineres separados por ";", ex.: 4x4x4;6x5x4 (ou 20,25 para cubos)')
+    parser.add_argument('--bloco', type=str, default='1,1,2',
+                        help='Caixa cujas rotações valem quando a tarefa não traz orientações')
+    parser.add_argument('--backend', choices=BACKENDS, default='milp')
+    parser.add_argument('--tempo', type=float, default=60.0, help='Limite por tarefa única (s)')
+    parser.add_argument('-w', '--workers', type=int, default=None)
+    parser.add_argument('--threads', type=int, default=1, help='Threads do CP-SAT por processo')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--posicoes', action='store_true',
+                        help='Inclui as posições de cada bloco na saída')
+    parser.add_argument('-o', '--output', type=str, help='Grava os resultados em JSON lines')
+    args = parser.parse_args()
+
+    bloco = _dims(args.bloco)
+    if args.tarefas:
+        tarefas = ler_tarefas(args.tarefas, bloco)
+    elif args.sizes:
+        partes = args.sizes.split(';') if 'x' in args.sizes else args.sizes.split(',')
+        tarefas = []
+        for s in partes:
+            d = _dims(s)
+            tarefas.append(Tarefa(d * 3 if len(d) == 1 else d, orientacoes_bloco(bloco), s))
+    else:
+        parser.error('informe --tarefas ou --sizes')
+
+    unicas = len({canonica(tuple(t.container), t.orientations)[0] for t in tarefas})
+    print(f"[lote] {len(tarefas)} tarefas, {unicas} únicas após deduplicação", flush=True)
+
+    saida = open(args.output, 'w', encoding='utf-8') if args.output else None
+    inicio = time.perf_counter()
+    try:
+        for r in resolver_lote(tarefas, args.backend, args.tempo, args.workers,
+                               args.seed, args.threads, args.posicoes):
+            registro = {
+                'indice': r.indice, 'id': r.id, 'container': list(r.container),
+                'count': r.count, 'method': r.method, 'otimo': r.otimo,
+                'tempo_s': r.tempo_s, 'compartilhado': r.compartilhado,
+            }
+            if args.posicoes:
+                registro['placements'] = [
+                    {'x': x, 'y': y, 'z': z, 'orientation': o} for x, y, z, o in r.placements
+                ]
+            linha = json.dumps(registro, ensure_ascii=False)
+            if saida:
+                saida.write(linha + '\n')
+                saida.flush()
+            print(linha if not args.posicoes else
+                  f"{r.id or r.indice}: {r.count} blocos ({r.method})", flush=True)
+    finally:
+        if saida:
+            saida.close()
+    print(f"[lote] concluído em {time.perf_counter() - inicio:.2f}s", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Mochila exata na largura da célula: escolhe quantas colunas de cada item
+cabem na largura livre maximizando o valor (volume guardado).
+
+A recorrência é a da mochila 0/1 sobre a largura, vetorizada no NumPy: cada
+item desloca a tabela inteira de uma vez. Itens com várias cópias são
+quebrados em potências de 2 (1, 2, 4, ..., resto), e cópias que não teriam
+como entrar (mais colunas de uma largura do que cabem, ou piores que outras
+da mesma largura) são podadas antes. As tabelas não ficam em cache: a
+demanda restante muda de uma célula para a outra, a chave nunca se repete
+e cada tabela guardada custaria itens x largura bytes.
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+
+
+def _podar(larguras, valores, limites, capacidade):
+    """
+    Numa mesma largura só as cópias de maior valor podem entrar, e no
+    máximo capacidade // largura delas. Devolve os limites reduzidos.
+    """
+    limites = np.minimum(limites, capacidade // np.maximum(larguras, 1))
+    ordem = np.lexsort((-valores, larguras))
+    w, lim = larguras[ordem], limites[ordem]
+    inicio = np.r_[0, np.flatnonzero(np.diff(w)) + 1]
+    grupo = np.repeat(inicio, np.diff(np.r_[inicio, len(w)]))
+    acumulado = np.cumsum(lim)
+    antes = acumulado - lim - (acumulado - lim)[grupo]
+    teto = capacidade // np.maximum(w, 1)
+    podado = np.empty_like(limites)
+    podado[ordem] = np.clip(teto - antes, 0, lim)
+    return podado
+
+
+def _binarizar(limites: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quebra cada limite em 1, 2, 4, ..., resto: (item de origem, multiplicador)."""
+    itens, mult = [], []
+    for i, n in enumerate(limites.tolist()):
+        k = 1
+        while n > 0:
+            m = min(k, n)
+            itens.append(i)
+            mult.append(m)
+            n -= m
+            k *= 2
+    return np.array(itens, dtype=np.int64), np.array(mult, dtype=np.int64)
+
+
+def _tabela(capacidade: int, larguras: np.ndarray, valores: np.ndarray, limites: np.ndarray):
+    """
+    Tabela da mochila: melhor[c] é o maior valor em largura <= c e
+    pega[k, c] diz se a cópia binária k entra na solução de c.
+    """
+    itens, mult = _binarizar(limites)
+    w = larguras[itens] * mult
+    v = valores[itens] * mult
+    melhor = np.zeros(capacidade + 1, dtype=np.int64)
+    pega = np.zeros((len(w), capacidade + 1), dtype=bool)
+    for k in range(len(w)):
+        wk = w[k]
+        if wk > capacidade:
+            continue
+        candidato = melhor[:capacidade + 1 - wk] + v[k]
+        entra = candidato > melhor[wk:]
+        pega[k, wk:] = entra
+        np.maximum(melhor[wk:], candidato, out=melhor[wk:])
+    return melhor, pega, itens, mult, w
+
+
+def mochila_colunas(
+    larguras: Sequence[int],
+    valores: Sequence[int],
+    limites: Sequence[int],
+    capacidade: int
+) -> Tuple[int, np.ndarray]:
+    """
+    Mochila limitada: até `limites[i]` colunas de largura `larguras[i]` e
+    valor `valores[i]` numa largura `capacidade`. Devolve (valor ótimo,
+    colunas de cada item).
+    """
+    larguras = np.asarray(larguras, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.int64)
+    limites = _podar(larguras, valores, np.asarray(limites, dtype=np.int64), capacidade)
+    quantidades = np.zeros(len(larguras), dtype=np.int64)
+    usados = np.flatnonzero((limites > 0) & (valores > 0))
+    if len(usados) == 0 or capacidade <= 0:
+        return 0, quantidades
+
+    melhor, pega, itens, mult, w = _tabela(
+        int(capacidade), larguras[usados], valores[usados], limites[usados]
+    )
+    c = int(capacidade)
+    for k in range(len(w) - 1, -1, -1):
+        if pega[k, c]:
+            quantidades[usados[itens[k]]] += mult[k]
+            c -= w[k]
+    return int(melhor[capacidade]), quantidades
@@ -0,0 +1,109 @@
+"""
+Grade de ocupação em bits: cada (x, y) guarda o eixo z empacotado em
+palavras uint64, 1 bit por voxel em vez de 1 byte do `bool` do NumPy.
+
+Um teste de caixa é um AND entre as palavras da faixa [z, z+lz) e a máscara
+dessa faixa, sobre o bloco x × y da caixa; marcar é um OR. Com numba
+instalado o teste e a marcação rodam num laço compilado que para no
+primeiro conflito; sem numba usam fatias vetorizadas do NumPy.
+"""
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+BITS = 64
+
+
+@lru_cache(maxsize=None)
+def mascara_z(z0: int, z1: int) -> Tuple[int, int, np.ndarray]:
+    """(primeira palavra, última palavra + 1, máscaras) da faixa [z0, z1)."""
+    w0, w1 = z0 // BITS, (z1 - 1) // BITS + 1
+    mascaras = np.empty(w1 - w0, dtype=np.uint64)
+    for i, w in enumerate(range(w0, w1)):
+        lo = max(z0, w * BITS) - w * BITS
+        hi = min(z1, (w + 1) * BITS) - w * BITS
+        mascaras[i] = ((1 << (hi - lo)) - 1) << lo
+    mascaras.flags.writeable = False
+    return w0, w1, mascaras
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _livre_nb(bits, x0, x1, y0, y1, w0, w1, mascaras):
+        for x in range(x0, x1):
+            for y in range(y0, y1):
+                for w in range(w0, w1):
+                    if bits[x, y, w] & mascaras[w - w0]:
+                        return False
+        return True
+
+    @njit(cache=True)
+    def _ocupar_nb(bits, x0, x1, y0, y1, w0, w1, mascaras):
+        for x in range(x0, x1):
+            for y in range(y0, y1):
+                for w in range(w0, w1):
+                    bits[x, y, w] |= mascaras[w - w0]
+
+
+class OcupacaoBits:
+    def __init__(self, dx: int, dy: int, dz: int, usar_numba: Optional[bool] = None):
+        self.dx, self.dy, self.dz = dx, dy, dz
+        self.bits = np.zeros((dx, dy, (dz + BITS - 1) // BITS), dtype=np.uint64)
+        self.usar_numba = NUMBA_AVAILABLE if usar_numba is None else (usar_numba and NUMBA_AVAILABLE)
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+    def cabe(self, x, y, z, lx, ly, lz) -> bool:
+        """A caixa está dentro dos limites do contêiner."""
+        return (0 <= x and 0 <= y and 0 <= z
+                and x + lx <= self.dx and y + ly <= self.dy and z + lz <= self.dz)
+
+    def livre(self, x, y, z, lx, ly, lz) -> bool:
+        """Nenhum voxel da caixa está ocupado (a caixa deve caber no contêiner)."""
+        w0, w1, m = mascara_z(z, z + lz)
+        if self.usar_numba:
+            return _livre_nb(self.bits, x, x + lx, y, y + ly, w0, w1, m)
+        return not (self.bits[x:x + lx, y:y + ly, w0:w1] & m).any()
+
+    def ocupar(self, x, y, z, lx, ly, lz):
+        w0, w1, m = mascara_z(z, z + lz)
+        if self.usar_numba:
+            _ocupar_nb(self.bits, x, x + lx, y, y + ly, w0, w1, m)
+        else:
+            self.bits[x:x + lx, y:y + ly, w0:w1] |= m
+
+    def tentar(self, x, y, z, lx, ly, lz) -> bool:
+        """Marca a caixa se ela cabe e está livre; devolve se marcou."""
+        if self.cabe(x, y, z, lx, ly, lz) and self.livre(x, y, z, lx, ly, lz):
+            self.ocupar(x, y, z, lx, ly, lz)
+            return True
+        return False
+
+    def ocupados(self) -> int:
+        return int(np.unpackbits(self.bits.view(np.uint8)).sum())
+
+    def to_bool(self) -> np.ndarray:
+        """Grade (dx, dy, dz) de bool equivalente, para conferência e gráficos."""
+        plano = np.unpackbits(self.bits.view(np.uint8), axis=-1, bitorder='little')
+        return plano[..., :self.dz].astype(bool)
+
+
+def conflitos(placements, block_dims, dx: int, dy: int, dz: int) -> List[int]:
+    """
+    Índices das posições (x, y, z, o) que saem do contêiner ou sobrepõem
+    uma posição anterior da lista; vazio quando o empacotamento é válido.
+    """
+    ocupacao = OcupacaoBits(dx, dy, dz)
+    return [
+        i for i, (x, y, z, o) in enumerate(placements)
+        if not ocupacao.tentar(x, y, z, *block_dims[o])
+    ]
@@ -0,0 +1,304 @@
+"""
+Paletização de caixas iguais (um SKU por palete).
+
+Cada camada é um padrão 2D de retângulos a x b no estrado. Primeiro vem
+uma heurística de blocos em dois estágios (um corte em faixas, um corte
+transversal em cada faixa, até quatro blocos homogêneos); se ela não chega
+ao limite de área e o estrado não é grande demais para a caixa, roda a
+partição recursiva em guilhotina completa: um retângulo é preenchido por
+um bloco homogêneo ou cortado em dois retângulos resolvidos do mesmo
+jeito, com cortes só em combinações inteiras de a e b (pontos raster).
+O padrão depende só de (a, b) e das medidas do estrado e fica em cache,
+então milhares de SKUs com caixas repetidas custam um cálculo por tamanho
+de caixa.
+
+As camadas são empilhadas até a altura máxima da carga, misturando as
+faces de apoio da caixa quando isso aproveita melhor a altura.
+"""
+import os
+import time
+import argparse
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from alocacao_nas_celulas import TabelaProdutos, load_data_from_sqlite
+
+
+@dataclass(frozen=True, slots=True)
+class Palete:
+    largura: int
+    profundidade: int
+    altura_max: int  # altura útil da carga, sem o estrado
+
+
+# PBR 1200 x 1000, carga até 1500 mm acima do estrado
+palete_padrao = Palete(largura=1200, profundidade=1000, altura_max=1500)
+# a guilhotina exata só roda até tantos pares de pontos raster; acima
+# disso (caixas pequenas perto do estrado) fica só a heurística de blocos
+LIMITE_DP = 400
+
+
+def pontos_raster(comprimento: int, a: int, b: int) -> np.ndarray:
+    """Todos os i*a + j*b <= comprimento, em ordem (inclui 0)."""
+    i = np.arange(comprimento // a + 1)[:, None] * a
+    j = np.arange(comprimento // b + 1)[None, :] * b
+    soma = (i + j).ravel()
+    return np.unique(soma[soma <= comprimento])
+
+
+def _homogeneo(x, y, a: int, b: int):
+    return np.maximum((x // a) * (y // b), (x // b) * (y // a))
+
+
+def _guilhotina(X: int, Y: int, a: int, b: int):
+    """
+    Tabela de guilhotina para caixas a x b sobre os pontos raster de X e Y.
+    Devolve (xs, ys, valor, decisao, corte): valor[i, j] é o máximo de
+    caixas em xs[i] x ys[j]; decisao 0 = bloco homogêneo, 1 = corte
+    vertical em xs[corte], 2 = corte horizontal em ys[corte].
+    """
+    xs, ys = pontos_raster(X, a, b), pontos_raster(Y, a, b)
+    nx, ny = len(xs), len(ys)
+    homogeneo = _homogeneo(xs[:, None], ys[None, :], a, b)
+    teto = (xs[:, None] * ys[None, :]) // (a * b)
+    valor = homogeneo.copy()
+    decisao = np.zeros((nx, ny), dtype=np.int8)
+    corte = np.zeros((nx, ny), dtype=np.int32)
+    # resto[i, k]: maior raster <= xs[i] - xs[k]
+    resto_x = np.searchsorted(xs, xs[:, None] - xs[None, :], side='right') - 1
+    resto_y = np.searchsorted(ys, ys[:, None] - ys[None, :], side='right') - 1
+
+    for i in range(1, nx):
+        # cortes verticais só até a metade: as linhas < i já estão prontas
+        ks = np.arange(1, np.searchsorted(xs, xs[i] // 2, side='right'))
+        if len(ks):
+            v = valor[ks] + valor[resto_x[i, ks]]
+            melhor = v.argmax(axis=0)
+            v = v[melhor, np.arange(ny)]
+            troca = v > valor[i]
+            valor[i, troca] = v[troca]
+            decisao[i, troca] = 1
+            corte[i, troca] = ks[melhor[troca]]
+        for j in range(1, ny):
+            if valor[i, j] == teto[i, j]:
+                continue
+            ls = np.arange(1, np.searchsorted(ys, ys[j] // 2, side='right'))
+            if len(ls) == 0:
+                continue
+            h = valor[i, ls] + valor[i, resto_y[j, ls]]
+            m = h.argmax()
+            if h[m] > valor[i, j]:
+                valor[i, j] = h[m]
+                decisao[i, j] = 2
+                corte[i, j] = ls[m]
+    return xs, ys, valor, decisao, corte
+
+
+def _folhas_guilhotina(X: int, Y: int, a: int, b: int):
+    """Blocos homogêneos (x, y, largura, profundidade) da tabela de guilhotina."""
+    xs, ys, valor, decisao, corte = _guilhotina(X, Y, a, b)
+    folhas = []
+    pilha = [(len(xs) - 1, len(ys) - 1, 0, 0)]
+    while pilha:
+        i, j, x0, y0 = pilha.pop()
+        if decisao[i, j] == 1:
+            k = corte[i, j]
+            r = np.searchsorted(xs, xs[i] - xs[k], side='right') - 1
+            pilha += [(k, j, x0, y0), (r, j, x0 + xs[k], y0)]
+        elif decisao[i, j] == 2:
+            k = corte[i, j]
+            r = np.searchsorted(ys, ys[j] - ys[k], side='right') - 1
+            pilha += [(i, k, x0, y0), (i, r, x0, y0 + ys[k])]
+        else:
+            folhas.append((int(x0), int(y0), int(xs[i]), int(ys[j])))
+    return int(valor[-1, -1]), folhas
+
+
+def _multiplos(comprimento: int, a: int, b: int) -> np.ndarray:
+    return np.union1d(np.arange(0, comprimento + 1, a), np.arange(0, comprimento + 1, b))
+
+
+def _folhas_blocos(X: int, Y: int, a: int, b: int):
+    """
+    Heurística de blocos em dois estágios: um corte divide o estrado em duas
+    faixas e cada faixa leva um corte transversal, dando até quatro blocos
+    homogêneos. Um bloco homogêneo não perde nada se for encolhido até a
+    última coluna inteira, então basta cortar em múltiplos de a ou de b.
+    """
+    melhor = (-1, [])
+    for transpor in (False, True):
+        L, W = (Y, X) if transpor else (X, Y)
+        xs, ys = _multiplos(L, a, b), _multiplos(W, a, b)
+        larguras = np.r_[xs, L - xs]
+        faixa = _homogeneo(larguras[:, None], ys[None], a, b) + _homogeneo(larguras[:, None], W - ys[None], a, b)
+        corte_y = faixa.argmax(axis=1)
+        por_faixa = faixa[np.arange(len(larguras)), corte_y]
+        n = len(xs)
+        total = por_faixa[:n] + por_faixa[n:]
+        k = int(total.argmax())
+        if total[k] > melhor[0]:
+            x, y1, y2 = int(xs[k]), int(ys[corte_y[k]]), int(ys[corte_y[n + k]])
+            folhas = [(0, 0, x, y1), (0, y1, x, W - y1), (x, 0, L - x, y2), (x, y2, L - x, W - y2)]
+            if transpor:
+                folhas = [(y0, x0, h, w) for x0, y0, w, h in folhas]
+            melhor = (int(total[k]), folhas)
+    return melhor
+
+
+@lru_cache(maxsize=None)
+def _padrao(X: int, Y: int, a: int, b: int):
+    """(caixas, blocos homogêneos) da camada; a >= b já normalizado."""
+    if a > max(X, Y) or b > min(X, Y):
+        return 0, []
+    blocos = _folhas_blocos(X, Y, a, b)
+    # limite de área sobre o maior comprimento aproveitável de cada lado
+    # (maior ponto raster); a guilhotina completa só roda se pode ganhar dele
+    xs, ys = pontos_raster(X, a, b), pontos_raster(Y, a, b)
+    if blocos[0] < (int(xs[-1]) * int(ys[-1])) // (a * b) and len(xs) * len(ys) <= LIMITE_DP:
+        guilhotina = _folhas_guilhotina(X, Y, a, b)
+        if guilhotina[0] > blocos[0]:
+            return guilhotina
+    return blocos
+
+
+def padrao_camada(X: int, Y: int, a: int, b: int) -> int:
+    """Máximo de caixas a x b (giradas ou não) encontrado para um estrado X x Y."""
+    return _padrao(X, Y, max(a, b), min(a, b))[0]
+
+
+def posicoes_camada(X: int, Y: int, a: int, b: int) -> List[Tuple[int, int, int, int]]:
+    """Retângulos (x, y, largura, profundidade) do padrão de `padrao_camada`."""
+    a, b = max(a, b), min(a, b)
+    posicoes = []
+    for x0, y0, L, W in _padrao(X, Y, a, b)[1]:
+        w, d = (a, b) if (L // a) * (W // b) >= (L // b) * (W // a) else (b, a)
+        posicoes += [(x0 + x * w, y0 + y * d, w, d) for x in range(L // w) for y in range(W // d)]
+    return posicoes
+
+
+def empilhar(opcoes: List[Tuple[int, int]], altura_max: int) -> Tuple[int, List[int]]:
+    """
+    Mochila ilimitada na altura: `opcoes` são (altura da camada, caixas por
+    camada), no máximo três (as faces de apoio). Enumera as quantidades das
+    primeiras opções de uma vez e completa a altura com a última.
+    Devolve (total de caixas, número de camadas de cada opção).
+    """
+    camadas = [0] * len(opcoes)
+    validas = [k for k, (h, n) in enumerate(opcoes) if n > 0 and h <= altura_max]
+    if not validas:
+        return 0, camadas
+    hs = np.array([opcoes[k][0] for k in validas], dtype=np.int64)
+    ns = np.array([opcoes[k][1] for k in validas], dtype=np.int64)
+
+    grades = np.meshgrid(*[np.arange(altura_max // h + 1) for h in hs[:-1]], indexing='ij')
+    combos = np.stack([g.ravel() for g in grades], axis=1) if grades else np.zeros((1, 0), np.int64)
+    usada = combos @ hs[:-1]
+    combos, usada = combos[usada <= altura_max], usada[usada <= altura_max]
+    ultima = (altura_max - usada) // hs[-1]
+    total = combos @ ns[:-1] + ultima * ns[-1]
+
+    m = int(total.argmax())
+    for pos, k in enumerate(validas[:-1]):
+        camadas[k] = int(combos[m, pos])
+    camadas[validas[-1]] = int(ultima[m])
+    return int(total[m]), camadas
+
+
+def faces_apoio(dims, em_pe: bool = False) -> List[Tuple[int, int, int]]:
+    """(a, b, altura) para cada face de apoio; `em_pe` mantém a altura original."""
+    w, d, h = (int(v) for v in dims)
+    if em_pe:
+        return [(w, d, h)]
+    return list(dict.fromkeys([(w, d, h), (w, h, d), (d, h, w)]))
+
+
+def paletizar_caixa(dims, palete: Palete = palete_padrao, em_pe: bool = False):
+    """
+    Melhor carga de uma caixa: (caixas por palete, [(a, b, altura, caixas
+    por camada, camadas)] das faces usadas).
+    """
+    faces = faces_apoio(dims, em_pe)
+    opcoes = [(h, padrao_camada(palete.largura, palete.profundidade, a, b)) for a, b, h in faces]
+    total, camadas = empilhar(opcoes, palete.altura_max)
+    usadas = [(a, b, h, n, c) for (a, b, h), (_, n), c in zip(faces, opcoes, camadas) if c]
+    return total, usadas
+
+
+def paletizar(
+    produtos: TabelaProdutos,
+    palete: Palete = palete_padrao,
+    em_pe: bool = False
+) -> pd.DataFrame:
+    """
+    Caixas por palete e paletes necessários para a demanda de 30 dias de
+    cada SKU. O cálculo é feito uma vez por classe de dimensão.
+    """
+    classes = np.unique(produtos.classe)
+    total = np.zeros(len(produtos.dims_classe), dtype=np.int64)
+    camadas = np.zeros_like(total)
+    por_camada = np.zeros_like(total)
+    for c in classes:
+        total[c], usadas = paletizar_caixa(produtos.dims_classe[c], palete, em_pe)
+        camadas[c] = sum(u[4] for u in usadas)
+        por_camada[c] = max((u[3] for u in usadas), default=0)
+    caixas = produtos.por_classe(total)
+    volume_palete = palete.largura * palete.profundidade * palete.altura_max
+    return pd.DataFrame({
+        'sku': produtos.sku,
+        'nome_produto': produtos.nome,
+        'caixas_por_camada': produtos.por_classe(por_camada),
+        'camadas': produtos.por_classe(camadas),
+        'caixas_por_palete': caixas,
+        'ocupacao': caixas * produtos.dims.prod(axis=1, dtype=np.int64) / volume_palete,
+        'qtd_vendida_30d': produtos.demanda,
+        'paletes': np.where(caixas > 0, -(-produtos.demanda // np.maximum(caixas, 1)), 0),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paletização dos SKUs (camadas em guilhotina empilhadas)")
+    parser.add_argument(
+        "--db", type=str,
+        default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "produtos.db"))
+    )
+    parser.add_argument("--largura", type=int, default=palete_padrao.largura)
+    parser.add_argument("--profundidade", type=int, default=palete_padrao.profundidade)
+    parser.add_argument("--altura", type=int, default=palete_padrao.altura_max,
+                        help="Altura máxima da carga acima do estrado (mm)")
+    parser.add_argument("--em-pe", action="store_true", help="Caixas sempre com a altura original na vertical")
+    parser.add_argument("-n", "--n_produtos", type=int, default=None)
+    parser.add_argument("--sku", type=str, default=None, help="Mostra as camadas de um SKU")
+    parser.add_argument("-o", "--output", type=str, default=None)
+    args = parser.parse_args()
+
+    palete = Palete(args.largura, args.profundidade, args.altura)
+    _, produtos = load_data_from_sqlite(args.db)
+    if args.n_produtos is not None:
+        produtos = produtos[:args.n_produtos]
+
+    if args.sku:
+        j = int(np.flatnonzero(produtos.sku == args.sku)[0])
+        total, usadas = paletizar_caixa(produtos.dims[j], palete, args.em_pe)
+        print(f"{produtos.label(j)}: {total} caixas por palete")
+        for a, b, h, n, c in usadas:
+            print(f"  {c} camada(s) de {n} caixas {a}x{b} com altura {h} mm")
+            print(f"    {posicoes_camada(palete.largura, palete.profundidade, a, b)}")
+        return
+
+    inicio = time.perf_counter()
+    df = paletizar(produtos, palete, args.em_pe)
+    tempo = time.perf_counter() - inicio
+    saida = args.output or os.path.join(os.path.dirname(args.db), "paletizacao.csv")
+    df.to_csv(saida, index=False)
+    print(f"{len(df)} SKUs ({len(np.unique(produtos.classe))} tamanhos de caixa) em {tempo:.2f}s, "
+          f"{int(df['paletes'].sum())} paletes no total; "
+          f"{int((df['caixas_por_palete'] == 0).sum())} SKUs não cabem no palete")
+    print(f"Resultado salvo em: {saida}")
+
+
+if __name__ == "__main__":
+    main()
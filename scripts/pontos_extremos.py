@@ -0,0 +1,217 @@
+"""
+Empacotamento 3D em coordenadas contínuas (mm), sem voxelizar a célula.
+
+O espaço livre é mantido como a lista de espaços maximais vazios (EMS):
+caixas alinhadas aos eixos, cada uma tão grande quanto possível, que juntas
+cobrem todo o volume livre. Os cantos de origem dos EMS são os pontos
+extremos onde um item pode encostar. Um item cabe num ponto se cabe inteiro
+no EMS, então o teste de encaixe é exato e vetorizado sobre a lista toda,
+sem comparar a candidata caixa a caixa com o que já foi colocado.
+
+Cada item vai para o ponto mais baixo (z, depois y, depois x) em que cabe,
+na primeira rotação permitida que servir. Os EMS tocados pela caixa são
+quebrados em até seis pedaços e os pedaços contidos em outro EMS, ou finos
+demais para qualquer item restante, são descartados.
+
+Eixos: x = largura, y = profundidade, z = altura (como em `Celula`).
+"""
+import time
+import argparse
+from itertools import permutations
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+REGRAS = {
+    'volume': lambda d: d.prod(axis=1),
+    'altura': lambda d: d[:, 2],
+    'area': lambda d: d[:, 0] * d[:, 1],
+}
+
+
+class EspacosLivres:
+    """Espaços maximais vazios como dois arrays (n, 3): cantos `lo` e `hi`."""
+
+    def __init__(self, dims):
+        self.lo = np.zeros((1, 3), dtype=np.int64)
+        self.hi = np.asarray(dims, dtype=np.int64).reshape(1, 3).copy()
+
+    def __len__(self) -> int:
+        return len(self.lo)
+
+    def encaixe(self, rots: np.ndarray) -> Optional[Tuple[int, int]]:
+        """
+        (EMS, rotação) do ponto mais baixo, mais ao fundo e mais à esquerda
+        onde alguma das rotações `rots` (k, 3) cabe, ou None.
+        """
+        cabe = ((self.hi - self.lo)[:, None, :] >= rots[None]).all(axis=2)
+        ems = np.flatnonzero(cabe.any(axis=1))
+        if len(ems) == 0:
+            return None
+        lo = self.lo[ems]
+        i = ems[np.lexsort((lo[:, 0], lo[:, 1], lo[:, 2]))[0]]
+        return int(i), int(cabe[i].argmax())
+
+    def ocupar(self, p: np.ndarray, t: np.ndarray, menor_lado: int = 1):
+        """Tira a caixa [p, p + t) do espaço livre."""
+        q = p + t
+        toca = ((self.lo < q) & (p < self.hi)).all(axis=1)
+        lo_t, hi_t = self.lo[toca], self.hi[toca]
+        self.lo, self.hi = self.lo[~toca], self.hi[~toca]
+
+        pedacos_lo, pedacos_hi = [], []
+        for eixo in range(3):
+            antes = lo_t[:, eixo] < p[eixo]
+            lo, hi = lo_t[antes], hi_t[antes].copy()
+            hi[:, eixo] = p[eixo]
+            pedacos_lo.append(lo)
+            pedacos_hi.append(hi)
+
+            depois = q[eixo] < hi_t[:, eixo]
+            lo, hi = lo_t[depois].copy(), hi_t[depois]
+            lo[:, eixo] = q[eixo]
+            pedacos_lo.append(lo)
+            pedacos_hi.append(hi)
+
+        caixas = np.hstack([np.concatenate(pedacos_lo), np.concatenate(pedacos_hi)])
+        caixas = caixas[((caixas[:, 3:] - caixas[:, :3]) >= menor_lado).all(axis=1)]
+        if len(caixas) == 0:
+            return
+        caixas = np.unique(caixas, axis=0)
+        lo, hi = caixas[:, :3], caixas[:, 3:]
+
+        # um EMS antigo nunca cabe num pedaço novo (os pedaços saem de EMS
+        # antigos, que não se continham), então só os novos são filtrados
+        todos_lo = np.concatenate([self.lo, lo])
+        todos_hi = np.concatenate([self.hi, hi])
+        contido = ((todos_lo[None] <= lo[:, None]) & (hi[:, None] <= todos_hi[None])).all(axis=2)
+        contido[np.arange(len(lo)), len(self.lo) + np.arange(len(lo))] = False
+        manter = ~contido.any(axis=1)
+        self.lo = np.concatenate([self.lo, lo[manter]])
+        self.hi = np.concatenate([self.hi, hi[manter]])
+
+
+def orientacoes(dims, rotacionar: bool = True, so_em_pe: bool = False) -> List[Tuple[int, int, int]]:
+    """
+    Rotações distintas da caixa. `so_em_pe` mantém a altura original
+    (só gira em torno do eixo vertical).
+    """
+    w, d, h = (int(v) for v in dims)
+    if not rotacionar:
+        return [(w, d, h)]
+    if so_em_pe:
+        return list(dict.fromkeys([(w, d, h), (d, w, h)]))
+    return list(dict.fromkeys(permutations((w, d, h))))
+
+
+def _chave_dominancia(caixa: np.ndarray, rotacionar: bool, so_em_pe: bool) -> np.ndarray:
+    """Dimensões comparáveis entre itens, coerentes com as rotações permitidas."""
+    if not rotacionar:
+        return caixa
+    if so_em_pe:
+        return np.r_[np.sort(caixa[:2]), caixa[2]]
+    return np.sort(caixa)
+
+
+def empacotar(
+    container,
+    dims: np.ndarray,
+    regra: str = 'volume',
+    rotacionar: bool = True,
+    so_em_pe: bool = False
+):
+    """
+    Empacota os itens `dims` (n, 3) em mm no contêiner (largura,
+    profundidade, altura), em ordem decrescente de `regra`.
+
+    Devolve (colocados, nao_colocados): colocados é uma lista de
+    (item, x, y, z, w, d, h) e nao_colocados os índices que não couberam.
+    """
+    dims = np.asarray(dims, dtype=np.int64).reshape(-1, 3)
+    ordem = np.argsort(-REGRAS[regra](dims), kind='stable')
+    # menor lado entre os itens que ainda faltam, para podar EMS inúteis
+    menor_restante = np.minimum.accumulate(dims[ordem].min(axis=1)[::-1])[::-1]
+
+    livres = EspacosLivres(container)
+    volume_livre = int(np.prod(container))
+    # menores dimensões que já falharam: o espaço livre só diminui, então
+    # um item que domina alguma delas também não cabe
+    falhas = np.empty((0, 3), dtype=np.int64)
+    colocados, nao_colocados = [], []
+
+    for k, item in enumerate(ordem):
+        caixa = dims[item]
+        chave = _chave_dominancia(caixa, rotacionar, so_em_pe)
+        volume = int(caixa.prod())
+        if volume > volume_livre or (falhas <= chave).all(axis=1).any():
+            nao_colocados.append(int(item))
+            continue
+
+        rots = np.array(orientacoes(caixa, rotacionar, so_em_pe), dtype=np.int64)
+        escolha = livres.encaixe(rots)
+        if escolha is None:
+            nao_colocados.append(int(item))
+            falhas = np.vstack([falhas[~(chave <= falhas).all(axis=1)], chave])
+            continue
+
+        ems, r = escolha
+        p, t = livres.lo[ems].copy(), rots[r]
+        menor = int(menor_restante[k + 1]) if k + 1 < len(ordem) else 1
+        livres.ocupar(p, t, menor)
+        volume_livre -= volume
+        colocados.append((int(item), *map(int, p), *map(int, t)))
+
+    return colocados, nao_colocados
+
+
+def melhor_regra(container, dims: np.ndarray, regras=tuple(REGRAS), **kwargs):
+    """Roda cada regra de ordenação e fica com a que ocupa mais volume."""
+    melhor = None
+    for regra in regras:
+        colocados, nao = empacotar(container, dims, regra, **kwargs)
+        volume = sum(w * d * h for *_, w, d, h in colocados)
+        if melhor is None or volume > melhor[0]:
+            melhor = (volume, regra, colocados, nao)
+    return melhor
+
+
+def main():
+    import os
+    from alocacao_nas_celulas import load_data_from_sqlite
+
+    parser = argparse.ArgumentParser(
+        description="Empacotamento contínuo (mm) dos produtos numa célula por espaços maximais"
+    )
+    parser.add_argument(
+        "--db", type=str,
+        default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "produtos.db"))
+    )
+    parser.add_argument("-n", "--n_itens", type=int, default=1000,
+                        help="Número de produtos (uma unidade de cada)")
+    parser.add_argument("--regra", choices=list(REGRAS) + ['melhor'], default='melhor')
+    parser.add_argument("--sem-rotacao", action="store_true")
+    parser.add_argument("--em-pe", action="store_true", help="Só gira em torno do eixo vertical")
+    args = parser.parse_args()
+
+    celula, produtos = load_data_from_sqlite(args.db)
+    produtos = produtos[:args.n_itens]
+    container = (celula.largura, celula.profundidade, celula.altura)
+    kwargs = dict(rotacionar=not args.sem_rotacao, so_em_pe=args.em_pe)
+
+    inicio = time.perf_counter()
+    if args.regra == 'melhor':
+        volume, regra, colocados, nao = melhor_regra(container, produtos.dims, **kwargs)
+    else:
+        regra = args.regra
+        colocados, nao = empacotar(container, produtos.dims, regra, **kwargs)
+        volume = sum(w * d * h for *_, w, d, h in colocados)
+    tempo = time.perf_counter() - inicio
+
+    ocupacao = volume / (celula.largura * celula.profundidade * celula.altura)
+    print(f"{len(colocados)} de {len(produtos)} itens na célula "
+          f"{celula.largura}x{celula.profundidade}x{celula.altura} mm, regra '{regra}', "
+          f"ocupação {ocupacao:.1%}, {tempo:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
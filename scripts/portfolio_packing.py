@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Portfólio de solvers: greedy, MILP (HiGHS ou CBC) e CP-SAT correm ao mesmo
+tempo, cada um no seu processo, e a resposta é a melhor que sair dentro do
+orçamento de tempo.
+
+O melhor resultado até agora (incumbente) fica num `mp.Value` compartilhado:
+o greedy continua reiniciando enquanto não há prova de ótimo e os solvers
+exatos, que rodam em fatias de tempo e releem o incumbente a cada uma,
+exigem pelo menos incumbente + 1 blocos, de modo que um modelo inviável
+prova que o incumbente é ótimo. A corrida termina quando alguém
+prova otimalidade, quando o incumbente bate o limite de volume ou quando o
+orçamento acaba; os processos restantes são encerrados.
+
+Cada worker roda no seu próprio grupo de processos (POSIX), para que o
+encerramento alcance também o CBC que o PuLP lança como subprocesso.
+"""
+import os
+import json
+import signal
+import time
+import queue
+import argparse
+import importlib.util
+import multiprocessing as mp
+
+BACKENDS = ['greedy', 'milp', 'cpsat']
+# Primeira fatia (s) dos solvers exatos antes de recomeçar com o incumbente
+FATIA_INICIAL = 2.0
+
+
+def limite_volume(dx, dy, dz, block_dims) -> int:
+    """Nenhum empacotamento passa de volume do contêiner / volume do bloco."""
+    return (dx * dy * dz) // min(lx * ly * lz for lx, ly, lz in block_dims)
+
+
+def disponivel(nome: str) -> bool:
+    if nome == 'greedy':
+        return importlib.util.find_spec('numpy') is not None
+    if nome == 'milp':
+        return any(importlib.util.find_spec(m) for m in ('scipy', 'pulp'))
+    if nome == 'cpsat':
+        return importlib.util.find_spec('ortools') is not None
+    return False
+
+
+def _publicar(incumbente, fila, nome, placements, otimo, inicio):
+    with incumbente.get_lock():
+        melhorou = len(placements) > incumbente.value
+        if melhorou:
+            incumbente.value = len(placements)
+        if melhorou or otimo:
+            fila.put((nome, placements, otimo, time.perf_counter() - inicio))
+
+
+def _greedy(dx, dy, dz, block_dims, prazo, incumbente, fila, inicio, seed):
+    import random
+    from run_packing_gpu import greedy_pack
+
+    teto = limite_volume(dx, dy, dz, block_dims)
+    rodada = 0
+    while time.perf_counter() < prazo and incumbente.value < teto:
+        random.seed(seed + rodada)
+        placements = greedy_pack(dx, dy, dz, block_dims)
+        _publicar(incumbente, fila, 'greedy', placements, len(placements) >= teto, inicio)
+        rodada += 1
+
+
+def _resolver_exato(nome, dx, dy, dz, block_dims, limite, minimo, threads):
+    if nome == 'milp' and importlib.util.find_spec('scipy'):
+        from distribuir_milp import solve_packing_highs
+        return solve_packing_highs(dx, dy, dz, block_dims, time_limit=limite,
+                                   minimo=minimo, com_status=True)
+    if nome == 'milp':
+        from distribuir_milp import solve_packing
+        return solve_packing(dx, dy, dz, block_dims, time_limit=limite,
+                             minimo=minimo, com_status=True)
+    from run_packing_ortools import ortools_pack
+    return ortools_pack(dx, dy, dz, block_dims, time_limit=limite,
+                        threads=threads, minimo=minimo, com_status=True)
+
+
+def _exato(nome, dx, dy, dz, block_dims, prazo, incumbente, fila, inicio, threads):
+    """
+    Resolve em fatias de tempo que dobram a cada rodada. Cada fatia lê o
+    incumbente do momento e exige incumbente + 1 blocos; se ele melhorou
+    durante a fatia, a próxima recomeça com o corte novo. Sem novidade, o
+    resto do orçamento vai numa fatia só. A otimalidade vem do status do
+    solver, não do relógio.
+    """
+    fatia = FATIA_INICIAL
+    while True:
+        restante = prazo - time.perf_counter()
+        if restante < 0.1:
+            return
+        corte = incumbente.value
+        minimo = corte + 1 if corte else 0
+        placements, status = _resolver_exato(
+            nome, dx, dy, dz, block_dims, min(fatia, restante), minimo, threads
+        )
+        if status.status == 'inviavel':
+            # nada com incumbente + 1 blocos: o incumbente é ótimo. Vai o
+            # valor provado, porque a solução que o atingiu, publicada por
+            # outro processo, ainda pode estar a caminho na fila
+            fila.put((nome, corte, True, time.perf_counter() - inicio))
+            return
+        if placements:
+            _publicar(incumbente, fila, nome, placements, status.otimo, inicio)
+        if status.otimo:
+            return
+        fatia = fatia * 2 if incumbente.value > corte else restante
+
+
+def _executar(nome, dx, dy, dz, block_dims, prazo, incumbente, fila, inicio, seed, threads):
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    try:
+        if nome == 'greedy':
+            _greedy(dx, dy, dz, block_dims, prazo, incumbente, fila, inicio, seed)
+        else:
+            _exato(nome, dx, dy, dz, block_dims, prazo, incumbente, fila, inicio, threads)
+    except ImportError as e:
+        fila.put((nome, f"indisponível: {e}", False, 0.0))
+
+
+def _encerrar(p, forcar=False):
+    """Sinaliza o grupo do worker (ele e o CBC que tiver lançado)."""
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(p.pid, signal.SIGKILL if forcar else signal.SIGTERM)
+            return
+        except ProcessLookupError:
+            pass  # o worker ainda não criou o grupo, ou o grupo já acabou
+    if p.is_alive():
+        p.kill() if forcar else p.terminate()
+
+
+def portfolio_pack(dx, dy, dz, block_dims, tempo=60.0, backends=BACKENDS, seed=0, threads=None):
+    """
+    Corre os backends em paralelo e devolve um dict com o melhor resultado:
+    method, count, placements, otimo (provado) e o log de eventos da corrida.
+    """
+    ctx = mp.get_context()
+    incumbente = ctx.Value('i', 0)
+    fila = ctx.Queue()
+    inicio = time.perf_counter()
+    prazo = inicio + tempo
+    teto = limite_volume(dx, dy, dz, block_dims)
+    threads = threads or max(1, (mp.cpu_count() or 2) - 2)
+
+    processos = {}
+    for nome in backends:
+        if not disponivel(nome):
+            print(f"[portfolio] {nome}: indisponível, ignorado")
+            continue
+        p = ctx.Process(
+            target=_executar,
+            args=(nome, dx, dy, dz, block_dims, prazo, incumbente, fila, inicio, seed, threads),
+            daemon=True,
+        )
+        p.start()
+        processos[nome] = p
+
+    melhor = {'method': None, 'count': 0, 'placements': [], 'otimo': False}
+    eventos = []
+    provado = None  # ótimo provado por inviabilidade, à espera da solução
+    try:
+        while any(p.is_alive() for p in processos.values()) or not fila.empty():
+            try:
+                nome, placements, otimo, t = fila.get(timeout=max(0.0, min(0.1, prazo - time.perf_counter())))
+            except queue.Empty:
+                if time.perf_counter() >= prazo and provado is None:
+                    break
+                continue
+            if isinstance(placements, str):
+                print(f"[portfolio] {nome}: {placements}")
+                continue
+            eventos.append({'method': nome, 'count': placements if isinstance(placements, int) else len(placements),
+                            'otimo': otimo, 'tempo_s': round(t, 3)})
+            if isinstance(placements, int):
+                provado = placements
+            else:
+                if len(placements) > melhor['count']:
+                    melhor.update(method=nome, count=len(placements), placements=placements)
+                if otimo:
+                    provado = len(placements)
+            if (provado is not None and melhor['count'] >= provado) or melhor['count'] >= teto:
+                melhor['otimo'] = True
+                break
+    finally:
+        for p in processos.values():
+            _encerrar(p)
+        for p in processos.values():
+            p.join(timeout=2)
+            if p.is_alive():
+                _encerrar(p, forcar=True)
+                p.join()
+
+    melhor['tempo_s'] = round(time.perf_counter() - inicio, 3)
+    melhor['eventos'] = eventos
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfólio greedy + MILP + CP-SAT em paralelo")
+    parser.add_argument('-a', '--dx', type=int, required=True)
+    parser.add_argument('-l', '--dy', type=int, required=True)
+    parser.add_argument('-p', '--dz', type=int, required=True)
+    parser.add_argument('--tempo', type=float, default=60.0, help='Orçamento total (s)')
+    parser.add_argument('--backends', type=str, default=','.join(BACKENDS),
+                        help='Subconjunto de greedy,milp,cpsat')
+    parser.add_argument('--threads', type=int, default=None, help='Threads do CP-SAT')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-j', '--json', action='store_true')
+    parser.add_argument('-o', '--output', type=str)
+    args = parser.parse_args()
+
+    dx, dy, dz = args.dx, args.dy, args.dz
+    block_dims = [(1,1,2), (2,1,1), (1,2,1)]
+    melhor = portfolio_pack(dx, dy, dz, block_dims, args.tempo,
+                            args.backends.split(','), args.seed, args.threads)
+
+    result = {
+        'method': f"portfolio:{melhor['method']}",
+        'container': {'dx': dx, 'dy': dy, 'dz': dz, 'block_orientations': block_dims},
+        'count': melhor['count'],
+        'otimo': melhor['otimo'],
+        'tempo_s': melhor['tempo_s'],
+        'eventos': melhor['eventos'],
+        'placements': [{'x': x, 'y': y, 'z': z, 'orientation': o}
+                       for x, y, z, o in melhor['placements']],
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"JSON salvo em {args.output}")
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    if not args.json and not args.output:
+        print(f"Portfólio: {melhor['count']} blocos em {dx}x{dy}x{dz} via {melhor['method']} "
+              f"({'ótimo' if melhor['otimo'] else 'melhor encontrado'}, {melhor['tempo_s']:.2f}s)")
+        for e in melhor['eventos']:
+            print(f"  {e['tempo_s']:>8.3f}s  {e['method']:<7} {e['count']}  {'ótimo' if e['otimo'] else ''}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import os
+import sqlite3
+import time
+import argparse
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from alocacao_nas_celulas import (
+    TabelaProdutos,
+    dimensoes_celula,
+    allocate_grouped_cells,
+    load_data_from_sqlite,
+    save_summary_csv,
+    salvar_alocacao_sqlite,
+)
+
+
+def carregar_alocacao_anterior(
+    db_path: str
+) -> Tuple[Dict[str, Tuple[int, int, int, int]], Dict[str, Dict[int, int]], int]:
+    """
+    Lê a última alocação salva por `salvar_alocacao_sqlite`.
+    Retorna (retrato sku -> (largura, profundidade, altura, demanda),
+    alocação sku -> {celula: qtd}, número de células). Sem alocação salva,
+    devolve estruturas vazias e 0 células.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        tabelas = {
+            r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table'"
+            )
+        }
+        if not {'alocacao', 'alocacao_produtos'} <= tabelas:
+            return {}, {}, 0
+        retrato = {}
+        n_cells = 0
+        for sku, w, d, h, dem, n in conn.execute(
+            "SELECT sku, largura_mm, profundidade_mm, altura_mm, "
+            "qtd_vendida_30d, n_celulas FROM alocacao_produtos"
+        ):
+            retrato[sku] = (w, d, h, dem)
+            n_cells = n
+        alocacao: Dict[str, Dict[int, int]] = {}
+        for sku, celula, qtd in conn.execute(
+            "SELECT sku, celula, qtd FROM alocacao"
+        ):
+            alocacao.setdefault(sku, {})[celula - 1] = qtd
+    finally:
+        conn.close()
+    return retrato, alocacao, n_cells
+
+
+def diff_produtos(
+    produtos: TabelaProdutos,
+    retrato: Dict[str, Tuple[int, int, int, int]]
+) -> Tuple[Set[str], Set[str], Set[str]]:
+    """
+    Compara a tabela atual com o retrato da última alocação.
+    Retorna (alterados, novos, removidos) por SKU; um SKU é alterado quando
+    muda a dimensão ou a demanda de 30 dias.
+    """
+    alterados, novos = set(), set()
+    atuais = zip(
+        produtos.sku, map(tuple, produtos.dims.tolist()), produtos.demanda.tolist()
+    )
+    for sku, dims, dem in atuais:
+        anterior = retrato.get(sku)
+        if anterior is None:
+            novos.add(sku)
+        elif anterior != dims + (dem,):
+            alterados.add(sku)
+    removidos = set(retrato) - set(produtos.sku)
+    return alterados, novos, removidos
+
+
+def realocar_incremental(
+    produtos: TabelaProdutos,
+    retrato: Dict[str, Tuple[int, int, int, int]],
+    alocacao_anterior: Dict[str, Dict[int, int]],
+    n_cells: int
+) -> Tuple[np.ndarray, List[dict]]:
+    """
+    Mantém fixas as posições dos SKUs inalterados e realoca apenas o que
+    mudou: SKUs novos ou com caixa nova vão inteiros para a realocação; se
+    só a demanda mudou, a redução sai das posições existentes e só o
+    aumento é realocado. O espaço liberado nas células afetadas é ocupado
+    primeiro, depois a sobra das demais. Retorna a matriz de
+    alocação no formato de `allocate_grouped_cells` e a lista de movimentações.
+    """
+    cel = dimensoes_celula
+    alterados, novos, removidos = diff_produtos(produtos, retrato)
+    afetados = alterados | removidos
+    celulas_afetadas = sorted({
+        c for sku in afetados for c in alocacao_anterior.get(sku, {})
+    })
+
+    # 1) posições fixas: SKUs inalterados continuam onde estavam; SKUs com
+    # a mesma caixa e demanda nova mantêm até min(alocado, demanda) nas
+    # células de maior quantidade e só o excedente ou a falta se move
+    caps = produtos.cap_per_col(cel)
+    allocation = np.zeros((n_cells, len(produtos)), dtype=np.int64)
+    rem_width = [cel.largura] * n_cells
+    pendentes = []
+    for j, sku in enumerate(produtos.sku):
+        mesma_caixa = sku in retrato and retrato[sku][:3] == tuple(produtos.dims[j].tolist())
+        if sku in novos or (sku in alterados and not mesma_caixa) or caps[j] == 0:
+            pendentes.append(j)
+            continue
+        manter = produtos.demanda[j] if sku in alterados else None
+        anteriores = alocacao_anterior.get(sku, {})
+        for c in sorted(anteriores, key=lambda c: (-anteriores[c], c)):
+            qtd = anteriores[c] if manter is None else min(anteriores[c], manter)
+            if qtd <= 0:
+                continue
+            if manter is not None:
+                manter -= qtd
+            allocation[c, j] = qtd
+            rem_width[c] -= -(-qtd // caps[j]) * produtos.largura[j]
+        if allocation[:, j].sum() < produtos.demanda[j]:
+            pendentes.append(j)
+
+    # 2) realoca os pendentes: células afetadas primeiro, depois as demais
+    ordem = celulas_afetadas + [c for c in range(n_cells) if c not in celulas_afetadas]
+    pendentes = np.array(pendentes, dtype=np.int64)
+    residual = produtos.demanda[pendentes] - allocation[:, pendentes].sum(axis=0)
+    sub_alloc = allocate_grouped_cells(
+        produtos[pendentes], len(ordem), [rem_width[c] for c in ordem],
+        demands=residual
+    )
+    allocation[np.ix_(ordem, pendentes)] += sub_alloc
+
+    # 3) lista de movimentações
+    depois: Dict[str, Dict[int, int]] = {}
+    celulas, idx = np.nonzero(allocation)
+    for c, j in zip(celulas.tolist(), idx.tolist()):
+        depois.setdefault(produtos.sku[j], {})[c] = int(allocation[c, j])
+
+    movimentos = []
+    for sku in sorted(set(alocacao_anterior) | set(depois)):
+        antes = alocacao_anterior.get(sku, {})
+        agora = depois.get(sku, {})
+        for c in sorted(set(antes) | set(agora)):
+            qa, qd = antes.get(c, 0), agora.get(c, 0)
+            if qa != qd:
+                movimentos.append({
+                    'sku': sku,
+                    'celula': c + 1,
+                    'qtd_antes': qa,
+                    'qtd_depois': qd,
+                    'delta': qd - qa,
+                })
+    movimentos.sort(key=lambda m: (m['celula'], m['sku']))
+    return allocation, movimentos
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Realoca apenas os SKUs que mudaram desde a última alocação"
+    )
+    parser.add_argument(
+        "--db", type=str,
+        default=os.path.abspath(
+            os.path.join(
+                os.path.dirname(__file__), "..", "data", "produtos.db"
+            )
+        ),
+        help="Caminho para o banco SQLite."
+    )
+    parser.add_argument(
+        "-c", "--cells",
+        type=int, default=3,
+        help="Número de células disponíveis."
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    inicio = time.time()
+    _, produtos = load_data_from_sqlite(args.db)
+    retrato, alocacao_anterior, n_anterior = carregar_alocacao_anterior(args.db)
+
+    if n_anterior != args.cells:
+        # Sem base comparável: recalcula tudo e registra como novo ponto de partida
+        print("Sem alocação anterior compatível; executando alocação completa.")
+        allocation = allocate_grouped_cells(produtos, args.cells)
+        movimentos = []
+    else:
+        allocation, movimentos = realocar_incremental(
+            produtos, retrato, alocacao_anterior, args.cells
+        )
+
+    save_summary_csv(allocation, produtos, args.cells, args.db)
+    salvar_alocacao_sqlite(allocation, produtos, args.cells, args.db)
+
+    output_path = os.path.join(os.path.dirname(args.db), "movimentacoes.csv")
+    pd.DataFrame(
+        movimentos, columns=['sku', 'celula', 'qtd_antes', 'qtd_depois', 'delta']
+    ).to_csv(output_path, index=False)
+    print(f"{len(movimentos)} movimentações salvas em: {output_path}")
+    print(f"Tempo total: {time.time() - inicio:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,56 +4,104 @@ import argparse
 import numpy as np
 import random
 from math import ceil
-from numba import cuda
 from distribuir_milp import Cuboid
+from ocupacao_bitset import OcupacaoBits
+
+# CUDA e numba são opcionais: sem GPU a fitness roda na CPU, com numba
+# (paralelo) quando instalado ou com NumPy vetorizado
+try:
+    from numba import cuda
+    CUDA_AVAILABLE = cuda.is_available()
+except ImportError:
+    cuda = None
+    CUDA_AVAILABLE = False
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+BACKEND_FITNESS = 'gpu_numba' if CUDA_AVAILABLE else ('cpu_numba' if NUMBA_AVAILABLE else 'cpu_numpy')
 
 # -----------------------------------------------------------------------------
 def filter_collisions(placements, block_dims, dx, dy, dz):
-    occupancy = np.zeros((dx, dy, dz), dtype=bool)
+    occupancy = OcupacaoBits(dx, dy, dz)
     filtered = []
     for x, y, z, o in placements:
-        lx, ly, lz = block_dims[o]
-        if x+lx <= dx and y+ly <= dy and z+lz <= dz:
-            region = occupancy[x:x+lx, y:y+ly, z:z+lz]
-            if not region.any():
-                filtered.append((x,y,z,o))
-                occupancy[x:x+lx, y:y+ly, z:z+lz] = True
+        if occupancy.tentar(x, y, z, *block_dims[o]):
+            filtered.append((x,y,z,o))
     return filtered
 
-@cuda.jit
-def fitness_kernel(sols, block_dims, dx, dy, dz, fitness):
-    pop_size, N, _ = sols.shape
-    idx = cuda.grid(1)
-    if idx < pop_size:
-        count = 0
-        for t in range(N):
-            x = sols[idx,t,0]; y = sols[idx,t,1]; z = sols[idx,t,2]
-            o = int(sols[idx,t,3])
-            lx = block_dims[o,0]; ly = block_dims[o,1]; lz = block_dims[o,2]
-            if 0 <= x <= dx-lx and 0 <= y <= dy-ly and 0 <= z <= dz-lz:
-                count += 1
-        fitness[idx] = count
-
-def gpu_heuristic_pack(dx, dy, dz, block_dims, pop_size, N):
-    sols = np.empty((pop_size, N, 4), dtype=np.int32)
-    for i in range(pop_size):
-        sols[i,:,0] = np.random.randint(0, dx, size=N)
-        sols[i,:,1] = np.random.randint(0, dy, size=N)
-        sols[i,:,2] = np.random.randint(0, dz, size=N)
-        sols[i,:,3] = np.random.randint(0, len(block_dims), size=N)
-
-    d_sols       = cuda.to_device(sols)
-    d_block_dims = cuda.to_device(np.array(block_dims, dtype=np.int32))
-    fitness_arr  = np.zeros(pop_size, dtype=np.int32)
-    d_fitness    = cuda.to_device(fitness_arr)
-
-    threads_per_block = 128
-    blocks_per_grid   = ceil(pop_size / threads_per_block)
-    fitness_kernel[blocks_per_grid, threads_per_block](
-        d_sols, d_block_dims, dx, dy, dz, d_fitness
-    )
-
-    fitness_arr = d_fitness.copy_to_host()
+if cuda is not None:
+    @cuda.jit
+    def fitness_kernel(sols, block_dims, dx, dy, dz, fitness):
+        pop_size, N, _ = sols.shape
+        idx = cuda.grid(1)
+        if idx < pop_size:
+            count = 0
+            for t in range(N):
+                x = sols[idx,t,0]; y = sols[idx,t,1]; z = sols[idx,t,2]
+                o = int(sols[idx,t,3])
+                lx = block_dims[o,0]; ly = block_dims[o,1]; lz = block_dims[o,2]
+                if 0 <= x <= dx-lx and 0 <= y <= dy-ly and 0 <= z <= dz-lz:
+                    count += 1
+            fitness[idx] = count
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def fitness_cpu_numba(sols, block_dims, dx, dy, dz, fitness):
+        # mesmo critério do kernel CUDA, um indivíduo por iteração do prange
+        pop_size, N, _ = sols.shape
+        for idx in prange(pop_size):
+            count = 0
+            for t in range(N):
+                x = sols[idx,t,0]; y = sols[idx,t,1]; z = sols[idx,t,2]
+                o = sols[idx,t,3]
+                lx = block_dims[o,0]; ly = block_dims[o,1]; lz = block_dims[o,2]
+                if 0 <= x <= dx-lx and 0 <= y <= dy-ly and 0 <= z <= dz-lz:
+                    count += 1
+            fitness[idx] = count
+
+
+def fitness_cpu_numpy(sols, block_dims, dx, dy, dz):
+    dims = block_dims[sols[:, :, 3]]
+    limite = np.array([dx, dy, dz], dtype=np.int32) - dims
+    xyz = sols[:, :, :3]
+    dentro = ((xyz >= 0) & (xyz <= limite)).all(axis=2)
+    return dentro.sum(axis=1, dtype=np.int32)
+
+
+def avaliar_fitness(sols, block_dims, dx, dy, dz, backend=None):
+    """Fitness de toda a população no backend pedido (padrão: o melhor disponível)."""
+    backend = backend or BACKEND_FITNESS
+    block_dims = np.asarray(block_dims, dtype=np.int32)
+    fitness = np.zeros(len(sols), dtype=np.int32)
+    if backend == 'gpu_numba':
+        d_sols       = cuda.to_device(sols)
+        d_block_dims = cuda.to_device(block_dims)
+        d_fitness    = cuda.to_device(fitness)
+        threads_per_block = 128
+        blocks_per_grid   = ceil(len(sols) / threads_per_block)
+        fitness_kernel[blocks_per_grid, threads_per_block](
+            d_sols, d_block_dims, dx, dy, dz, d_fitness
+        )
+        return d_fitness.copy_to_host()
+    if backend == 'cpu_numba':
+        fitness_cpu_numba(sols, block_dims, dx, dy, dz, fitness)
+        return fitness
+    return fitness_cpu_numpy(sols, block_dims, dx, dy, dz)
+
+
+def gerar_populacao(dx, dy, dz, n_orientacoes, pop_size, N, seed=None):
+    """População inteira (pop_size, N, 4) em uma única chamada ao gerador."""
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, [dx, dy, dz, n_orientacoes], size=(pop_size, N, 4), dtype=np.int32)
+
+
+def gpu_heuristic_pack(dx, dy, dz, block_dims, pop_size, N, seed=None, backend=None):
+    sols = gerar_populacao(dx, dy, dz, len(block_dims), pop_size, N, seed)
+    fitness_arr = avaliar_fitness(sols, block_dims, dx, dy, dz, backend)
     best_idx    = int(np.argmax(fitness_arr))
     best_sol    = sols[best_idx]
     placements  = [
@@ -70,14 +118,13 @@ def greedy_pack(dx, dy, dz, block_dims):
                 for z in range(dz-lz+1):
                     coords.append((x,y,z,o))
     random.shuffle(coords)
-    occupancy = np.zeros((dx, dy, dz), dtype=bool)
+    occupancy = OcupacaoBits(dx, dy, dz)
     placements = []
     for x,y,z,o in coords:
         lx,ly,lz = block_dims[o]
-        region = occupancy[x:x+lx, y:y+ly, z:z+lz]
-        if not region.any():
+        if occupancy.livre(x, y, z, lx, ly, lz):
             placements.append((x,y,z,o))
-            occupancy[x:x+lx, y:y+ly, z:z+lz] = True
+            occupancy.ocupar(x, y, z, lx, ly, lz)
     return placements
 
 # -----------------------------------------------------------------------------
@@ -93,6 +140,9 @@ def main():
                         help='Define num_blocks = floor(dx*dy*dz/2)')
     parser.add_argument('--greedy',        action='store_true',
                         help='Usa método greedy first‑fit')
+    parser.add_argument('--seed',          type=int, default=None)
+    parser.add_argument('--backend',       choices=['gpu_numba', 'cpu_numba', 'cpu_numpy'],
+                        default=None, help=f'Fitness (padrão: {BACKEND_FITNESS})')
     parser.add_argument('-j','--json',     action='store_true')
     parser.add_argument('-o','--output',   type=str)
     parser.add_argument('--save-plot',     action='store_true')
@@ -112,11 +162,12 @@ def main():
         else:
             parser.error("Use --num-blocks ou --auto-blocks ou --greedy")
         placements = gpu_heuristic_pack(dx, dy, dz, block_dims,
-                                        pop_size=args.pop_size, N=N)
+                                        pop_size=args.pop_size, N=N,
+                                        seed=args.seed, backend=args.backend)
         placements = filter_collisions(placements, block_dims, dx, dy, dz)
 
     result = {
-        'method': 'greedy' if args.greedy else 'gpu_numba',
+        'method': 'greedy' if args.greedy else (args.backend or BACKEND_FITNESS),
         'container': {'dx':dx,'dy':dy,'dz':dz,'block_orientations':block_dims},
         'count': len(placements),
         'placements': [{'x':x,'y':y,'z':z,'orientation':o} for x,y,z,o in placements]
@@ -1,7 +1,7 @@
 import json
 import argparse
 from ortools.sat.python import cp_model
-from distribuir_milp import Cuboid
+from distribuir_milp import Cuboid, StatusSolver, status_por_limite
 
 try:
     import plotly.graph_objects as go
@@ -9,7 +9,11 @@ try:
 except ImportError:
     PLOTLY_AVAILABLE = False
 
-def ortools_pack(dx, dy, dz, block_dims, time_limit=300, threads=8):
+def ortools_pack(dx, dy, dz, block_dims, time_limit=300, threads=8, minimo=0, com_status=False):
+    # `minimo` > 0 exige pelo menos essa quantidade de blocos (incumbente
+    # conhecido): se o modelo ficar inviável, o incumbente já é ótimo.
+    # Com `com_status` devolve (placements, StatusSolver) a partir do status
+    # e do limite do CP-SAT
     model = cp_model.CpModel()
     b = {}
     # Define variável binária para cada orientação e posição possível
@@ -21,6 +25,8 @@ def ortools_pack(dx, dy, dz, block_dims, time_limit=300, threads=8):
 
     # Objetivo: maximizar número de blocos
     model.Maximize(sum(b.values()))
+    if minimo:
+        model.Add(sum(b.values()) >= minimo)
 
     # Restrições de não sobreposição
     for x in range(dx):
@@ -47,7 +53,15 @@ def ortools_pack(dx, dy, dz, block_dims, time_limit=300, threads=8):
         for (o, i, j, k), var in b.items():
             if solver.Value(var):
                 placements.append((i, j, k, o))
-    return placements
+    if not com_status:
+        return placements
+    if status == cp_model.INFEASIBLE:
+        return placements, StatusSolver('inviavel')
+    if not placements and status != cp_model.OPTIMAL:
+        return placements, StatusSolver('sem_solucao')
+    return placements, status_por_limite(
+        len(placements), solver.BestObjectiveBound(), status == cp_model.OPTIMAL
+    )
 
 def plot_interactive(dx, dy, dz, placements, block_dims):
     if not PLOTLY_AVAILABLE:
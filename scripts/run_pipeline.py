@@ -1,27 +1,171 @@
-import subprocess
-import sys
+import hashlib
+import json
 import os
+import time
+import uuid
+from typing import Any, Callable, List, Tuple
+
+import pandas as pd
+
+
+class Pipeline:
+    """
+    Executa as etapas no mesmo processo e guarda a impressão digital da
+    entrada de cada uma. Quando a impressão não mudou e os artefatos existem,
+    a etapa é pulada e sua saída só é lida do disco se alguém pedir.
+    """
+
+    def __init__(self, cache_path: str, forcar: bool = False):
+        self.cache_path = cache_path
+        self.forcar = forcar
+        self.cache = {}
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding='utf-8') as f:
+                self.cache = json.load(f)
+        self.tempos: List[Tuple[str, str, float]] = []
+
+    def _salvar_cache(self):
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f, indent=2)
+
+    def etapa(
+        self,
+        nome: str,
+        entrada: Any,
+        artefatos: List[str],
+        executar: Callable[[], Any],
+        restaurar: Callable[[], Any]
+    ) -> Tuple[str, Callable[[], Any]]:
+        digital = hashlib.sha256(
+            json.dumps([nome, entrada], sort_keys=True, default=str).encode()
+        ).hexdigest()
+        inicio = time.perf_counter()
+        if (not self.forcar and self.cache.get(nome) == digital
+                and all(os.path.exists(a) for a in artefatos)):
+            status = "cache"
+            memo = []
+
+            def saida():
+                if not memo:
+                    memo.append(restaurar())
+                return memo[0]
+        else:
+            status = "executada"
+            valor = executar()
+            self.cache[nome] = digital
+            self._salvar_cache()
+
+            def saida():
+                return valor
+        self.tempos.append((nome, status, time.perf_counter() - inicio))
+        print(f">>> {nome}: {status}")
+        return digital, saida
+
+    def relatorio(self):
+        print(f"\n{'etapa':<12}{'status':<12}{'tempo (s)':>10}")
+        for nome, status, tempo in self.tempos:
+            print(f"{nome:<12}{status:<12}{tempo:>10.3f}")
+        print(f"{'total':<24}{sum(t for *_, t in self.tempos):>10.3f}")
 
-def run(cmd):
-    print(f">>> {cmd}")
-    res = subprocess.run(cmd, shell=True)
-    if res.returncode != 0:
-        sys.exit(res.returncode)
 
 if __name__ == "__main__":
     import argparse
     p = argparse.ArgumentParser()
     p.add_argument("-n", "--n_produtos", type=int, default=30)
     p.add_argument("-c", "--cells",      type=int, default=3)
+    p.add_argument("--seed", type=int, default=None,
+                   help="Sem seed o catálogo muda a cada execução e nada vem do cache")
+    p.add_argument("--model", choices=['default', 'mix'], default='mix')
+    p.add_argument("--incremental", action="store_true",
+                   help="Realoca só os SKUs alterados desde a última alocação")
+    p.add_argument("--forcar", action="store_true", help="Ignora o cache de etapas")
+    p.add_argument("--plot", action="store_true", help="Mostra o gráfico 3D ao final")
     args = p.parse_args()
 
-    # 1) gerar CSV
-    run(f"python gerar_base_simulada.py --n_produtos {args.n_produtos}")
+    from gerar_base_simulada import gerar_produtos_simulados
+    from ingestao_csv import ingerir
+    from alocacao_nas_celulas import (
+        allocate_grouped_cells, allocate_grouped_cells_mix, carregar_alocacao_sqlite,
+        load_data_from_sqlite, save_summary_csv, salvar_alocacao_sqlite,
+    )
+    from armazenamento_parquet import caminho_alocacao
 
-    # 2) carregar no SQLite
-    run("python carregar_para_sqlite.py")
-
-    # 3) alocar (monta caminho absoluto do DB)
     project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    db_path = os.path.join(project_root, "data", "produtos.db")
-    run(f"python alocacao_nas_celulas.py --db \"{db_path}\" -c {args.cells}")
\ No newline at end of file
+    data_dir = os.path.join(project_root, "data")
+    csv_path = os.path.join(data_dir, "produtos_simulados.csv")
+    db_path = os.path.join(data_dir, "produtos.db")
+    rejeitos_path = os.path.join(data_dir, "produtos_rejeitados.csv")
+    resumo_path = os.path.join(data_dir, "resumo_alocacao_detalhada.csv")
+    movimentos_path = os.path.join(data_dir, "movimentacoes.csv")
+    pipe = Pipeline(os.path.join(data_dir, ".pipeline_cache.json"), args.forcar)
+
+    # 1) gerar catálogo (no modo incremental o CSV vem atualizado de fora)
+    if args.incremental:
+        st = os.stat(csv_path)
+        entrada = {'csv': csv_path, 'tamanho': st.st_size, 'mtime': st.st_mtime_ns}
+        fp_gerar, _ = pipe.etapa("gerar", entrada, [csv_path], lambda: None, lambda: None)
+    else:
+        seed = args.seed if args.seed is not None else uuid.uuid4().hex
+
+        def gerar():
+            df = gerar_produtos_simulados(args.n_produtos, seed=args.seed)
+            df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+        fp_gerar, _ = pipe.etapa(
+            "gerar", {'n': args.n_produtos, 'seed': seed}, [csv_path], gerar, lambda: None
+        )
+
+    # 2) carregar no SQLite em blocos, normalizando unidades e separando os
+    #    registros inválidos (o CSV pode vir de fora no modo incremental)
+    def carregar():
+        stats = ingerir(csv_path, db_path=db_path, rejeitos_path=rejeitos_path)
+        print(f"{stats['validas']} de {stats['lidas']} linhas carregadas, "
+              f"{stats['rejeitadas']} rejeitadas")
+    fp_carregar, _ = pipe.etapa("carregar", fp_gerar, [db_path], carregar, lambda: None)
+
+    # 3) alocar e gravar alocação, resumo e (no incremental) movimentações
+    def alocar():
+        _, produtos = load_data_from_sqlite(db_path)
+        movimentos = None
+        if args.incremental:
+            from realocacao_incremental import carregar_alocacao_anterior, realocar_incremental
+            retrato, anterior, n_anterior = carregar_alocacao_anterior(db_path)
+            if n_anterior == args.cells:
+                allocation, movimentos = realocar_incremental(
+                    produtos, retrato, anterior, args.cells
+                )
+            else:
+                allocation = allocate_grouped_cells(produtos, args.cells)
+        elif args.model == 'mix':
+            allocation = allocate_grouped_cells_mix(produtos, args.cells, 'mixed')
+        else:
+            allocation = allocate_grouped_cells(produtos, args.cells)
+        save_summary_csv(allocation, produtos, args.cells, db_path)
+        salvar_alocacao_sqlite(allocation, produtos, args.cells, db_path)
+        if args.incremental:
+            pd.DataFrame(
+                movimentos or [], columns=['sku', 'celula', 'qtd_antes', 'qtd_depois', 'delta']
+            ).to_csv(movimentos_path, index=False)
+            print(f"{len(movimentos or [])} movimentações salvas em: {movimentos_path}")
+        return produtos, allocation
+
+    def restaurar_alocacao():
+        _, produtos = load_data_from_sqlite(db_path)
+        return produtos, carregar_alocacao_sqlite(produtos, args.cells, db_path)
+    artefatos = [db_path, resumo_path, caminho_alocacao(data_dir)]
+    if args.incremental:
+        artefatos.append(movimentos_path)
+    _, alocacao = pipe.etapa(
+        "alocar",
+        {'upstream': fp_carregar, 'cells': args.cells, 'model': args.model,
+         'incremental': args.incremental},
+        artefatos, alocar, restaurar_alocacao
+    )
+
+    pipe.relatorio()
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+        from alocacao_nas_celulas import plot_allocation_3d
+        produtos, allocation = alocacao()
+        plot_allocation_3d(allocation, produtos, args.cells)
+        plt.show()
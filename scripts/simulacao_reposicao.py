@@ -0,0 +1,208 @@
+import os
+import time
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def carregar_slots(db_path: str) -> pd.DataFrame:
+    """
+    Junta a última alocação salva (sku, celula, qtd) com a demanda de 30 dias.
+    Cada linha é um slot; a demanda diária do SKU é repartida entre seus
+    slots na proporção da quantidade alocada.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        df = pd.read_sql_query(
+            "SELECT a.sku, a.celula, a.qtd, p.qtd_vendida_30d "
+            "FROM alocacao a JOIN produtos p ON p.sku = a.sku "
+            "WHERE a.qtd > 0",
+            conn
+        )
+    finally:
+        conn.close()
+    total_sku = df.groupby('sku')['qtd'].transform('sum')
+    df['taxa_diaria'] = df['qtd_vendida_30d'] / 30 * df['qtd'] / total_sku
+    return df
+
+
+def simular_reposicao(
+    capacidade: np.ndarray,
+    taxa_diaria: np.ndarray,
+    dias: int = 365,
+    n_cenarios: int = 1,
+    ponto_reposicao: float = 0.0,
+    lead_time: int = 0,
+    seed: Optional[int] = None,
+    bloco_dias: int = 30
+) -> Dict[str, np.ndarray]:
+    """
+    Replay diário de demanda Poisson contra slots de capacidade fixa,
+    vetorizado em (cenários × slots); os sorteios são feitos em blocos de dias.
+    Quando o estoque chega a `ponto_reposicao` × capacidade é disparada uma
+    viagem que completa o slot após `lead_time` dias.
+    Retorna, por cenário e slot: dias_ruptura, unidades_perdidas e viagens.
+    """
+    rng = np.random.default_rng(seed)
+    capacidade = np.asarray(capacidade, dtype=np.int64)
+    taxa_diaria = np.asarray(taxa_diaria, dtype=np.float64)
+    forma = (n_cenarios, capacidade.size)
+
+    cheio = np.broadcast_to(capacidade, forma)
+    estoque = cheio.copy()
+    gatilho = np.floor(capacidade * ponto_reposicao).astype(np.int64)
+    chegada = np.full(forma, -1, dtype=np.int64)  # dias até a reposição; -1 = nenhuma
+    dias_ruptura = np.zeros(forma, dtype=np.int64)
+    perdidas = np.zeros(forma, dtype=np.int64)
+    viagens = np.zeros(forma, dtype=np.int64)
+
+    for inicio in range(0, dias, bloco_dias):
+        n = min(bloco_dias, dias - inicio)
+        demanda_bloco = rng.poisson(taxa_diaria, size=(n,) + forma)
+        for demanda in demanda_bloco:
+            atendida = np.minimum(estoque, demanda)
+            falta = demanda - atendida
+            estoque -= atendida
+            dias_ruptura += falta > 0
+            perdidas += falta
+
+            # reposições pendentes chegam no fim do dia
+            chegou = chegada == 0
+            estoque[chegou] = cheio[chegou]
+            chegada[chegada >= 0] -= 1
+
+            pedir = (estoque <= gatilho) & (chegada < 0) & (capacidade > 0)
+            viagens += pedir
+            if lead_time == 0:
+                estoque[pedir] = cheio[pedir]
+            else:
+                chegada[pedir] = lead_time - 1
+
+    return {
+        'dias_ruptura': dias_ruptura,
+        'unidades_perdidas': perdidas,
+        'viagens': viagens,
+    }
+
+
+def _simular_fator(tarefa):
+    fator, capacidade, taxa, celulas, params, seed = tarefa
+    cap = np.floor(capacidade * fator).astype(np.int64)
+    res = simular_reposicao(cap, taxa, seed=seed, **params)
+    n_celulas = celulas.max() + 1
+    n_cen = params['n_cenarios']
+    # agrega por célula: soma por slot e média entre cenários
+    por_celula = {
+        nome: np.bincount(celulas, weights=valores.sum(axis=0), minlength=n_celulas) / n_cen
+        for nome, valores in res.items()
+    }
+    demanda_total = taxa.sum() * params['dias']
+    nivel_servico = 1 - res['unidades_perdidas'].sum(axis=1).mean() / max(demanda_total, 1e-9)
+    return fator, por_celula, nivel_servico
+
+
+def avaliar_fatores(
+    slots: pd.DataFrame,
+    fatores: List[float],
+    dias: int = 365,
+    n_cenarios: int = 20,
+    ponto_reposicao: float = 0.0,
+    lead_time: int = 0,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Simula cada fator de tamanho de slot em um processo separado e retorna
+    uma linha por (fator, célula) com médias de viagens e rupturas.
+    """
+    capacidade = slots['qtd'].to_numpy(dtype=np.int64)
+    taxa = slots['taxa_diaria'].to_numpy(dtype=np.float64)
+    celulas = slots['celula'].to_numpy(dtype=np.int64)
+    params = {
+        'dias': dias,
+        'n_cenarios': n_cenarios,
+        'ponto_reposicao': ponto_reposicao,
+        'lead_time': lead_time,
+    }
+    seeds = np.random.SeedSequence(seed).spawn(len(fatores))
+    tarefas = [
+        (f, capacidade, taxa, celulas, params, s)
+        for f, s in zip(fatores, seeds)
+    ]
+
+    linhas = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for fator, por_celula, nivel_servico in pool.map(_simular_fator, tarefas):
+            for c in np.unique(celulas):
+                linhas.append({
+                    'fator': fator,
+                    'celula': int(c),
+                    'viagens': por_celula['viagens'][c],
+                    'dias_ruptura': por_celula['dias_ruptura'][c],
+                    'unidades_perdidas': por_celula['unidades_perdidas'][c],
+                    'nivel_servico_global': round(nivel_servico, 4),
+                })
+    return pd.DataFrame(linhas)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Simula reposição dos slots alocados e avalia tamanhos de slot"
+    )
+    parser.add_argument(
+        "--db", type=str,
+        default=os.path.abspath(
+            os.path.join(
+                os.path.dirname(__file__), "..", "data", "produtos.db"
+            )
+        ),
+        help="Caminho para o banco SQLite (com a tabela alocacao)."
+    )
+    parser.add_argument("--dias", type=int, default=365, help="Horizonte simulado")
+    parser.add_argument("--cenarios", type=int, default=20, help="Cenários por fator")
+    parser.add_argument(
+        "--fatores", type=float, nargs='+', default=[0.5, 1.0, 1.5, 2.0],
+        help="Multiplicadores da capacidade atual de cada slot"
+    )
+    parser.add_argument(
+        "--ponto-reposicao", type=float, default=0.0,
+        help="Fração da capacidade que dispara a reposição"
+    )
+    parser.add_argument("--lead-time", type=int, default=0, help="Dias até a reposição chegar")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    slots = carregar_slots(args.db)
+    if slots.empty:
+        raise SystemExit(
+            f"A tabela alocacao em {args.db} está vazia (o modelo 'mix' não aloca "
+            "nada): rode alocacao_nas_celulas.py com outro modelo antes de simular."
+        )
+
+    inicio = time.time()
+    resultado = avaliar_fatores(
+        slots, args.fatores, args.dias, args.cenarios,
+        args.ponto_reposicao, args.lead_time, args.seed, args.workers
+    )
+    print(f"{len(slots)} slots × {args.dias} dias × {args.cenarios} cenários "
+          f"× {len(args.fatores)} fatores em {time.time() - inicio:.2f}s")
+    print(resultado.groupby('fator')[
+        ['viagens', 'dias_ruptura', 'unidades_perdidas', 'nivel_servico_global']
+    ].agg({'viagens': 'sum', 'dias_ruptura': 'sum',
+           'unidades_perdidas': 'sum', 'nivel_servico_global': 'first'}))
+
+    output_path = os.path.join(os.path.dirname(args.db), "simulacao_reposicao.csv")
+    resultado.to_csv(output_path, index=False)
+    print(f"Resultado salvo em: {output_path}")
+
+
+if __name__ == '__main__':
+    main()